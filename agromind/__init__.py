@@ -0,0 +1,3 @@
+"""
+Agromind irrigation dashboard: data access, caches and the Streamlit app
+"""
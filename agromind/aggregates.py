@@ -0,0 +1,138 @@
+"""
+range aggregates over irrigation / tail series
+
+Each series gets a prefix-sum index once per item data version: cumulative
+sums and counts of its (NaN-free) values. Any sub-range total, mean or
+tail/irrigation ratio is then two lookups, and weekly or monthly rollups are
+a few vectorized numpy operations instead of a pass over every point.
+"""
+import numpy as np
+
+from . import list_cache
+
+# ranges longer than this many days are charted as weekly totals, then monthly
+WEEKLY_AFTER_DAYS = 92
+MONTHLY_AFTER_DAYS = 366
+
+# prefix-sum indexes per item, bounded by array bytes
+_index_cache = list_cache.derived_cache()
+
+
+class SeriesIndex:
+    """
+    days of a series with cumulative sums and counts, for O(1) range queries
+    """
+    __slots__ = ("days", "sums", "counts")
+
+    def __init__(self, days, sums, counts):
+        self.days = days
+        self.sums = sums
+        self.counts = counts
+
+    @property
+    def nbytes(self):
+        return self.days.nbytes + self.sums.nbytes + self.counts.nbytes
+
+    @classmethod
+    def from_series(cls, series):
+        days = series.times.astype("U10").astype("datetime64[D]")
+        values = series.values
+        if len(days) > 1 and np.any(days[1:] < days[:-1]):
+            order = np.argsort(days, kind="stable")
+            days, values = days[order], values[order]
+        present = ~np.isnan(values)
+        sums = np.concatenate(([0.0], np.cumsum(np.where(present, values, 0.0))))
+        counts = np.concatenate(([0], np.cumsum(present)))
+        return cls(days, sums, counts)
+
+    def _bounds(self, start, end):
+        lo = 0 if start is None else int(np.searchsorted(self.days, np.datetime64(start, "D"), side="left"))
+        hi = len(self.days) if end is None else int(np.searchsorted(self.days, np.datetime64(end, "D"), side="right"))
+        return lo, max(lo, hi)
+
+    def total(self, start=None, end=None):
+        lo, hi = self._bounds(start, end)
+        return float(self.sums[hi] - self.sums[lo])
+
+    def count(self, start=None, end=None):
+        lo, hi = self._bounds(start, end)
+        return int(self.counts[hi] - self.counts[lo])
+
+    def mean(self, start=None, end=None):
+        lo, hi = self._bounds(start, end)
+        count = self.counts[hi] - self.counts[lo]
+        return float((self.sums[hi] - self.sums[lo]) / count) if count else None
+
+    def between(self, start=None, end=None):
+        """
+        the index restricted to [start, end]; a view, nothing is recomputed
+        """
+        lo, hi = self._bounds(start, end)
+        return SeriesIndex(self.days[lo:hi], self.sums[lo:hi + 1], self.counts[lo:hi + 1])
+
+    def span_days(self):
+        return int((self.days[-1] - self.days[0]).astype(int)) + 1 if len(self.days) else 0
+
+    def rollup(self, unit):
+        """
+        (period start days, totals, means) per "W" week (from Monday) or "M" month
+        """
+        if not len(self.days):
+            return self.days, self.sums[:0], self.sums[:0]
+        if unit == "W":
+            # day 0 of datetime64 is a Thursday, shift so weeks start on Monday
+            periods = (self.days.astype(np.int64) + 3) // 7
+        else:
+            periods = self.days.astype("datetime64[M]")
+        # first index of every period; days are sorted, so periods are contiguous
+        starts = np.flatnonzero(np.concatenate(([True], periods[1:] != periods[:-1])))
+        edges = np.append(starts, len(self.days))
+        totals = self.sums[edges[1:]] - self.sums[edges[:-1]]
+        counts = self.counts[edges[1:]] - self.counts[edges[:-1]]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(counts > 0, totals / counts, np.nan)
+        if unit == "W":
+            period_days = (periods[starts] * 7 - 3).astype("datetime64[D]")
+        else:
+            period_days = periods[starts].astype("datetime64[D]")
+        return period_days, totals, means
+
+
+def item_index(item):
+    """
+    {series name: SeriesIndex} for a models.ListItem, cached per data version
+    """
+    key = (item.id, item.data_version)
+    index = _index_cache.get(key)
+    if index is not None:
+        return index
+    index = {name: SeriesIndex.from_series(series) for name, series in item.series.items()}
+    _index_cache.set(key, index, sum(series_index.nbytes for series_index in index.values()))
+    return index
+
+
+def summary(item, start=None, end=None):
+    """
+    totals, daily means and the tail/irrigation ratio of an item over [start, end]
+    """
+    index = item_index(item)
+    figures = {}
+    for name, series_index in index.items():
+        figures[f"{name}_total"] = series_index.total(start, end)
+        figures[f"{name}_mean"] = series_index.mean(start, end)
+    irrigation = figures.get("irrigation_total")
+    tail = figures.get("tail_total")
+    figures["tail_ratio"] = tail / irrigation if irrigation and tail is not None else None
+    return figures
+
+
+def rollup_unit(series_index):
+    """
+    "W", "M" or None (keep daily points) for the length of the series
+    """
+    span = series_index.span_days()
+    if span > MONTHLY_AFTER_DAYS:
+        return "M"
+    if span > WEEKLY_AFTER_DAYS:
+        return "W"
+    return None
@@ -0,0 +1,57 @@
+"""
+process-wide exact-match cache of LLM answers per item
+
+Canned questions on the same report ("灌溉量是否正常?") are answered from
+memory instead of a full agent run. Entries are keyed by item id, normalized
+prompt and the item's data version, so an answer is never reused once the
+item's series changed.
+"""
+import re
+import unicodedata
+
+from . import list_cache
+
+# seconds an answer is reused
+ANSWER_TTL = 6 * 3600
+# approximate upper bound for all cached answers
+MAX_BYTES = 8 * 1024 * 1024
+
+_SPACES = re.compile(r"\s+")
+# trailing punctuation that does not change the question
+_TRAILING = "?？。.!！~～ "
+
+# answers by item, normalized prompt and data version, LRU within the byte budget
+answers = list_cache.TTLCache(ttl=ANSWER_TTL, stale_ttl=0, max_bytes=MAX_BYTES)
+
+
+def normalize_prompt(prompt):
+    """
+    fold width, case and whitespace so trivially different spellings match
+    """
+    prompt = unicodedata.normalize("NFKC", prompt)
+    prompt = _SPACES.sub(" ", prompt).strip().rstrip(_TRAILING)
+    return prompt.casefold()
+
+
+def _key(item_id, prompt, data_version):
+    return item_id, normalize_prompt(prompt), data_version
+
+
+def lookup(item_id, prompt, data_version):
+    """
+    cached answer or None; unknown data versions never hit
+    """
+    if data_version is None:
+        return None
+    answer = answers.get(_key(item_id, prompt, data_version))
+    if answer is None:
+        answers.counters.add(misses=1)
+    else:
+        answers.counters.add(hits=1)
+    return answer
+
+
+def store(item_id, prompt, data_version, answer):
+    if data_version is None or not answer:
+        return
+    answers.set(_key(item_id, prompt, data_version), answer, len(answer.encode("utf-8")))
@@ -0,0 +1,570 @@
+"""
+the Agromind dashboard
+
+Imported once per process by the thin main.py entry script: functions,
+fragments and styles are defined here a single time, and main.py only calls
+run() on every rerun.
+"""
+import datetime
+import os
+import uuid
+
+import requests
+import streamlit as st
+
+from . import aggregates
+from . import answer_cache
+from . import chart_data
+from . import chat_stream
+from . import config
+from . import history_cache
+from . import http_client
+from . import list_cache
+from . import list_fetch
+from . import llm_jobs
+from . import styles
+from . import tracing
+from . import transcript
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# seconds between polls of a running LLM request
+LLM_POLL_INTERVAL = 0.3
+# number of cards rendered up front and added per "load more" click
+PAGE_SIZE = 10
+# seconds a synced chat history is reused without asking the server again
+HISTORY_MAX_AGE = 30
+
+
+def init_session_state():
+    """
+    per-session defaults, on the first run of a session
+    """
+    if 'current_screen' not in st.session_state:
+        st.session_state.current_screen = 'main'
+    if "messages" not in st.session_state:
+        st.session_state.messages = transcript.Transcript()
+    if "shown_older_messages" not in st.session_state:
+        st.session_state.shown_older_messages = 0
+    if "selected_item_id" not in st.session_state:
+        st.session_state.selected_item_id = None
+    if "selected_item_version" not in st.session_state:
+        st.session_state.selected_item_version = None
+    if "selected_start_date" not in st.session_state:
+        st.session_state.selected_start_date = datetime.datetime.now().date() - datetime.timedelta(days=7)
+    if "selected_end_date" not in st.session_state:
+        st.session_state.selected_end_date = datetime.datetime.now().date()
+    if "visible_cards" not in st.session_state:
+        st.session_state.visible_cards = PAGE_SIZE
+    if "compact_view" not in st.session_state:
+        st.session_state.compact_view = False
+    if "history_prefetch" not in st.session_state:
+        st.session_state.history_prefetch = []
+    if "llm_job" not in st.session_state:
+        st.session_state.llm_job = None
+    if "trace_session" not in st.session_state:
+        st.session_state.trace_session = uuid.uuid4().hex[:8]
+
+
+# Function to switch screen
+def switch_to_question(item_id, data_version=None):
+    cancel_llm_job()
+    st.session_state.current_screen = 'question'
+    st.session_state.selected_item_id = item_id
+    st.session_state.selected_item_version = data_version
+
+    # get chat history from server, only the recent part stays in session
+    history = get_chat_history(item_id) or []
+    st.session_state.messages = transcript.Transcript(
+        # copies, the history cache keeps the originals
+        dict(msg) for msg in history
+    )
+    st.session_state.shown_older_messages = 0
+
+
+def show_older_messages():
+    st.session_state.shown_older_messages += transcript.OLDER_PAGE
+
+
+def hide_older_messages():
+    st.session_state.shown_older_messages = 0
+
+
+def switch_to_main():
+    cancel_llm_job()
+    st.session_state.current_screen = 'main'
+    st.session_state.selected_item_id = None
+    st.session_state.selected_item_version = None
+
+
+def load_more_cards():
+    st.session_state.visible_cards += PAGE_SIZE
+
+
+def toggle_compact_view():
+    # kept outside the widget key so it survives visits to the question screen
+    st.session_state.compact_view = st.session_state.compact_view_toggle
+
+
+def prefetch_chat_histories(item_ids):
+    """
+    warm the history cache for the cards on screen in the background
+    """
+    base_url = config.settings().llm_api_url
+    st.session_state.history_prefetch = [
+        future for future in st.session_state.history_prefetch if not future.done()
+    ] + history_cache.prefetch(
+        item_ids,
+        lambda item_id: lambda since, validators: fetch_chat_history(f"{base_url}/{item_id}/chat", since, validators)
+    )
+
+# API for chat history
+def fetch_chat_history(url, since, validators):
+    """
+    ask for the messages after index `since`; servers without incremental
+    support ignore it and return the full list
+    """
+    data = {
+        "prompt": "",
+        "since": since
+    }
+
+    headers = {
+        'Content-Type': 'application/json'
+    }
+    headers.update(http_client.conditional_headers(validators))
+
+    response = http_client.post(url, endpoint="history", idempotent=True, json=data, headers=headers)
+    response.raise_for_status()
+    tracing.add_bytes(len(response.content))
+    if response.status_code == 304:
+        tracing.annotate(cache="revalidated")
+        return 304, None, validators
+    tracing.annotate(cache="miss")
+    response.encoding = 'utf-8'
+    return response.status_code, response.json(), http_client.validators(response)
+
+def get_chat_history(item_id):
+    """
+    get chat history by ID, only downloading messages not cached yet
+    """
+    url = f"{config.settings().llm_api_url}/{item_id}/chat"
+
+    with tracing.span("get_chat_history", item_id=item_id, cache="hit"):
+        history_cache.wait_for_prefetch(item_id)
+        try:
+            return history_cache.histories.sync(
+                item_id,
+                lambda since, validators: fetch_chat_history(url, since, validators),
+                max_age=HISTORY_MAX_AGE
+            )  # 返回历史记录列表
+        except requests.exceptions.RequestException as e:
+            st.error(f"获取聊天历史记录失败: {e}")
+            return None
+# streaming API for LLM
+def llm_stream(url, prompt):
+    """
+    call API in streaming mode & yield response text chunks; runs on the
+    llm_jobs worker pool, so no st.* calls here
+    """
+    data = {
+        "prompt": prompt,
+        "stream": True
+    }
+
+    headers = {
+        'Content-Type': 'application/json',
+        'Accept': 'text/event-stream, application/json'
+    }
+
+    with http_client.post(url, endpoint="chat", json=data, headers=headers, stream=True) as response:
+        response.raise_for_status()
+        yield from chat_stream.iter_response_text(response)
+
+
+def ask_llm(prompt):
+    """
+    submit prompt for the selected item without blocking the script run
+    """
+    # a question sent before the previous answer arrived replaces it on screen
+    cancel_llm_job()
+    item_id = st.session_state.selected_item_id
+    data_version = st.session_state.selected_item_version
+    use_cache = config.settings().answer_cache
+    if use_cache and (answer := answer_cache.lookup(item_id, prompt, data_version)) is not None:
+        st.session_state.llm_job = llm_jobs.answered(item_id, prompt, answer)
+        # the backend never saw this exchange, keep it in the item's history ourselves,
+        # after any answer that finished since the last sync
+        get_chat_history(item_id)
+        history_cache.histories.record(item_id, [
+            {"role": "user", "content": prompt},
+            {"role": "assistant", "content": answer, "cached": True},
+        ])
+        return
+
+    def on_complete(job):
+        # the server history changed, next open must sync it
+        history_cache.histories.expire(job.item_id)
+        if use_cache and job.status == llm_jobs.DONE:
+            answer_cache.store(job.item_id, job.prompt, data_version, job.text)
+
+    url = f"{config.settings().llm_api_url}/{item_id}/chat"
+    st.session_state.llm_job = llm_jobs.submit(
+        item_id,
+        prompt,
+        lambda: llm_stream(url, prompt),
+        on_complete=on_complete,
+        # agent backends answer with "Thought: ...\nFinal Answer: ..."
+        parser=chat_stream.FinalAnswerParser() if config.settings().extract_final_answer else None,
+        # fair share of the LLM backend across sessions
+        session=st.session_state.trace_session
+    )
+
+
+def cancel_llm_job():
+    if st.session_state.llm_job is not None:
+        st.session_state.llm_job.cancel()
+        st.session_state.llm_job = None
+
+
+def summary_text(figures):
+    parts = []
+    if figures.get("irrigation_mean") is not None:
+        parts.append(f"灌溉总量 {figures['irrigation_total']:.1f} · 日均 {figures['irrigation_mean']:.1f}")
+    if figures.get("tail_mean") is not None:
+        parts.append(f"尾水总量 {figures['tail_total']:.1f} · 日均 {figures['tail_mean']:.1f}")
+    if figures.get("tail_ratio") is not None:
+        parts.append(f"尾水比 {figures['tail_ratio']:.1%}")
+    return " ｜ ".join(parts)
+
+
+def render_list_item(item, show_button=True, show_charts=True):
+    unique_key = str(uuid.uuid4())[:8]
+    # downsampled once per item, not on every rerun
+    series = chart_data.prepare_chart_data(item) if show_charts else None
+    # totals over the selected range, from the prefix-sum index
+    figures = summary_text(aggregates.summary(
+        item, st.session_state.selected_start_date, st.session_state.selected_end_date
+    )) if item.series else ""
+
+    # card
+    with st.container():
+        card_html = f"""
+        <div class="card-container">
+            <p class="date-text">{item.date_range}</p>
+            <h5 class="title-text">{item.title}</h5>
+            <p class="summary-text">{figures}</p>
+            <p class="content-text">{item.content}</p>
+        </div>
+        """
+        st.markdown(card_html, unsafe_allow_html=True)
+
+        # display chart
+        col1, col2 = st.columns(2)
+
+        # chart data
+        if series:
+            # chart 1
+            if 'irrigation' in series:
+                labels, values = series['irrigation']
+                irrigation_data = {
+                    '日期': labels,
+                    '灌溉量': values
+                }
+                with col1:
+                    st.caption('灌溉量')
+                    st.bar_chart(
+                        irrigation_data,
+                        y='灌溉量',
+                        x='日期',
+                        use_container_width=True
+                    )
+
+            # chart 2
+            if 'tail' in series:
+                labels, values = series['tail']
+                temperature_data = {
+                    '日期': labels,
+                    '尾水量': values
+                }
+                with col2:
+                    st.caption('尾水量')
+                    st.line_chart(
+                        temperature_data,
+                        y='尾水量',
+                        x='日期',
+                        use_container_width=True
+                    )
+
+        if show_button:
+            if st.button("向Agromind提问",
+                         on_click=switch_to_question,
+                         args=(item.id, item.data_version),
+                         key=item.id,
+                         use_container_width=True):
+                # leaving the card list fragment, redraw the whole page
+                st.rerun()
+
+def list_api(start_date, end_date):
+    base_url = config.settings().list_api_url
+    # reuse cached segments inside the range, one request per run of new days
+    segments = list_cache.plan_segments(start_date, end_date)
+    states = []
+    with tracing.span("list_api", segments=len(segments)) as span:
+        try:
+            segment_results = list_cache.fetch_segments(
+                segments,
+                lambda start, end: list_fetch.fetch_segment(base_url, start, end),
+                states=states
+            )
+            return list_cache.merge_segments(segment_results)
+        except requests.exceptions.RequestException as e:
+            st.error(f"列表API请求错误: {e}")
+            return None
+        finally:
+            misses = states.count(list_cache.MISS)
+            span.set(
+                cache="hit" if not misses else "miss" if misses == len(states) else "partial",
+                misses=misses,
+                bytes=sum(list_cache.list_results.size_of(list_cache.segment_key(segment)) for segment in segments)
+            )
+
+# read once per process, st.image dedupes the bytes by hash
+with open(os.path.join(ROOT, "logo.png"), "rb") as _logo:
+    LOGO = _logo.read()
+
+# earliest selectable date
+MIN_DATE = datetime.date(2023, 1, 1)
+
+
+# side bar
+def sidebar():
+    with st.sidebar:
+        st.image(LOGO, use_container_width=True)
+        st.markdown("# Hao Zhang")
+        st.caption("13510004950")
+        st.button("账号")
+        st.markdown("---")
+        st.markdown("设置您的农场或大棚")
+        st.markdown("设置大语言模型")
+        st.markdown("设置数据")
+        st.markdown("关于")
+        st.markdown("---")
+        st.caption("Version 1.0")
+
+
+# header fragment: picking dates only reruns the picker until a full range is chosen
+@st.fragment
+@tracing.traced("date_picker")
+def date_picker():
+    selected_date = st.date_input(
+        "",
+        (st.session_state.selected_start_date, st.session_state.selected_end_date),
+        min_value=MIN_DATE,
+        max_value=datetime.date.today(),
+        format="YYYY.MM.DD",
+    )
+    if isinstance(selected_date, tuple) and len(selected_date) == 2:
+        if (selected_date[0], selected_date[1]) != (st.session_state.selected_start_date,
+                                                    st.session_state.selected_end_date):
+            # new range starts again from the first page
+            st.session_state.visible_cards = PAGE_SIZE
+            history_cache.cancel_prefetch(st.session_state.history_prefetch)
+            st.session_state.history_prefetch = []
+            st.session_state.selected_start_date = selected_date[0]
+            st.session_state.selected_end_date = selected_date[1]
+            # the card list depends on the range, redraw the page
+            st.rerun()
+
+
+# card list fragment: "load more" only reruns the list
+@st.fragment
+@tracing.traced("card_list")
+def card_list():
+    contents = list_api(list_fetch.api_date(st.session_state.selected_start_date),
+                        list_fetch.api_date(st.session_state.selected_end_date)) or []
+
+    # compact view: one chart element for the whole page instead of two per card
+    st.toggle("紧凑视图",
+              value=st.session_state.compact_view,
+              key="compact_view_toggle",
+              on_change=toggle_compact_view)
+    compact = st.session_state.compact_view
+
+    # Render the first visible_cards sections, the rest load on demand
+    visible = contents[:st.session_state.visible_cards]
+    if compact and visible:
+        with tracing.span("render_page_chart", cards=len(visible)):
+            table, spec = chart_data.prepare_page_chart(
+                visible, (st.session_state.selected_start_date, st.session_state.selected_end_date)
+            )
+            st.vega_lite_chart(table, spec)
+    with tracing.span("render_list_item", cards=len(visible), compact=compact):
+        for content_item in visible:
+            render_list_item(content_item, show_button=True, show_charts=not compact)
+
+    if len(contents) > st.session_state.visible_cards:
+        st.button(f"加载更多 ({st.session_state.visible_cards}/{len(contents)})",
+                  on_click=load_more_cards,
+                  key="load_more_cards",
+                  use_container_width=True)
+
+    prefetch_chat_histories([content_item.id for content_item in visible])
+
+
+# polls the running LLM request and shows the answer as it streams in
+@st.fragment(run_every=LLM_POLL_INTERVAL)
+def pending_answer():
+    job = st.session_state.llm_job
+    if job is None:
+        return
+
+    with st.chat_message("assistant", avatar=config.settings().assistant_avatar):
+        if job.reasoning:
+            with st.expander("思考过程", expanded=False):
+                st.markdown(job.reasoning)
+        if job.text:
+            st.markdown(job.text + ("" if job.done() else "▌"))
+        else:
+            # Show loading message while waiting for response
+            st.markdown("<span style='color: #bbbbbb'>*...  思考中  ...*</span>", unsafe_allow_html=True)
+            if queued := job.queue_position():
+                position, wait = queued
+                st.caption(f"排队中：第 {position} 位"
+                           + ("" if wait is None else f"，预计等待约 {wait:.0f} 秒"))
+
+    if job.done():
+        st.session_state.llm_job = None
+        if job.text:
+            # add AI message to session_state
+            st.session_state.messages.append({"role": "assistant", "content": job.text, "cached": job.cached})
+        elif job.error is not None:
+            st.session_state.llm_error = f"LLM API请求出错: {job.error}"
+        # redraw the transcript with the final answer
+        st.rerun()
+
+
+# chat fragment: sending a message only reruns the transcript and input
+def older_messages():
+    """
+    collapsed part of the transcript, drawn from the shared history cache on demand
+    """
+    messages = st.session_state.messages
+    shown = min(st.session_state.shown_older_messages, messages.older)
+    if shown < messages.older:
+        st.button(f"显示更早的消息 ({messages.older - shown})",
+                  on_click=show_older_messages,
+                  key="show_older_messages",
+                  use_container_width=True)
+    if shown:
+        history = get_chat_history(st.session_state.selected_item_id) or []
+        with st.container():
+            st.markdown(transcript.older_markdown(history, messages.older, shown))
+        st.button("收起", on_click=hide_older_messages, key="hide_older_messages", use_container_width=True)
+
+
+@st.fragment
+@tracing.traced("chat")
+def chat():
+    if st.session_state.messages.older:
+        older_messages()
+
+    for message in st.session_state.messages:
+        with st.chat_message(message["role"], avatar=config.settings().user_avatar if message[
+                                                                                   "role"] == "user" else config.settings().assistant_avatar):
+            st.markdown(message["content"])
+            if message.get("cached"):
+                st.caption("缓存的回答")
+
+    if error := st.session_state.pop("llm_error", None):
+        st.error(error)
+
+    # user query, one request at a time
+    if user_query := st.chat_input("请输入您的问题", disabled=st.session_state.llm_job is not None):
+        # add message to session_state
+        st.session_state.messages.append({"role": "user", "content": user_query})
+
+        # user message display
+        with st.chat_message("user", avatar=config.settings().user_avatar):
+            st.markdown(user_query)
+
+        ask_llm(user_query)
+
+    if st.session_state.llm_job is not None:
+        pending_answer()
+
+
+def debug_panel():
+    with st.expander("性能调试", expanded=False):
+        st.caption("缓存")
+        st.json({
+            "list": list_cache.list_results.stats(),
+            "history": history_cache.histories.stats(),
+            "llm": llm_jobs.admission.stats(),
+            "answers": answer_cache.answers.stats(),
+        })
+        st.caption("最近的耗时记录 (ms)")
+        rows = []
+        for trace in reversed(tracing.recent(50)):
+            for span in trace["spans"]:
+                rows.append({
+                    "trace": trace["trace"],
+                    "time": datetime.datetime.fromtimestamp(trace["ts"]).strftime("%H:%M:%S"),
+                    "trace_ms": trace["duration_ms"],
+                    "span": span["name"],
+                    "span_ms": span["duration_ms"],
+                    "bytes": span.get("bytes"),
+                    "cache": span.get("cache"),
+                })
+        st.dataframe(rows, use_container_width=True)
+
+
+def run():
+    """
+    one script run; called by main.py on every rerun
+    """
+    # streamlit page layout
+    st.set_page_config(layout="wide")
+    init_session_state()
+    tracing.begin("rerun", session=st.session_state.trace_session, screen=st.session_state.current_screen)
+    try:
+        styles.inject()
+
+        if st.session_state.current_screen == 'main':
+            sidebar()
+
+        # switch page header
+        if st.session_state.current_screen == 'main':
+            st.markdown("""
+                <div class="fixed-header">
+                </div>
+            """, unsafe_allow_html=True)
+
+            date_picker()
+
+        else:
+            st.markdown("""
+                    <div class="fixed-header">
+                    </div>
+                """, unsafe_allow_html=True)
+            if st.button("返回", key="header_back_button", on_click=switch_to_main):
+                st.session_state.current_screen = 'main'
+
+        # content wrapper
+        st.markdown('<div class="content-wrapper">', unsafe_allow_html=True)
+
+        # switch page contents
+        if st.session_state.current_screen == 'main':
+            card_list()
+
+        elif st.session_state.current_screen == 'question':
+            chat()
+
+        # hidden timing panel, open the app with ?debug=1
+        if st.query_params.get("debug") == "1":
+            debug_panel()
+
+        # Close content-wrapper div
+        st.markdown('</div>', unsafe_allow_html=True)
+    finally:
+        tracing.end()
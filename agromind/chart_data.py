@@ -0,0 +1,163 @@
+"""
+chart series preparation for list cards
+
+Series arrive already parsed on models.ListItem; here they are downsampled
+with LTTB so long ranges only send a fixed number of points to the browser,
+and the result is cached per item id and data version. Series spanning
+several months are drawn as weekly or monthly totals from the aggregates
+index instead.
+
+The compact view draws every card of a page in one faceted Vega-Lite chart
+over a single long-format table instead of two chart elements per card; the
+table and spec are cached per page and date range.
+"""
+import numpy as np
+import pandas as pd
+
+from . import aggregates
+from . import list_cache
+
+# points per chart; a card chart is only a few hundred pixels wide
+MAX_POINTS = 200
+
+# series name -> (label, mark) in the compact view
+SERIES_MARKS = {
+    "irrigation": ("灌溉量", "bar"),
+    "tail": ("尾水量", "line"),
+}
+# pixel size of one card's chart in the compact view
+FACET_WIDTH = 260
+FACET_HEIGHT = 110
+
+# downsampled series per item and compact-view tables per page
+_series_cache = list_cache.derived_cache()
+_page_cache = list_cache.derived_cache()
+
+
+def lttb(values, threshold):
+    """
+    Largest-Triangle-Three-Buckets: indices of `threshold` points that keep
+    the visual shape of `values` (x is the point index)
+    """
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    y = np.nan_to_num(values)
+    x = np.arange(n, dtype=np.float64)
+    # first and last points are always kept, the rest are split into buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # average of the next bucket (or the last point for the final bucket)
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        area = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+
+    return selected
+
+
+def downsample(labels, values, max_points=MAX_POINTS):
+    if len(values) <= max_points:
+        return labels, values
+    indices = lttb(values, max_points)
+    return labels[indices], values[indices]
+
+
+def prepare_chart_data(item, max_points=MAX_POINTS):
+    """
+    return {series name: (labels, values)} ready for st.*_chart, cached per item
+    """
+    key = (item.id, item.data_version, max_points)
+    chart_series = _series_cache.get(key)
+    if chart_series is not None:
+        return chart_series
+
+    chart_series = {}
+    nbytes = 0
+    index = aggregates.item_index(item)
+    for name, series in item.series.items():
+        unit = aggregates.rollup_unit(index[name])
+        if unit is not None:
+            days, values, _ = index[name].rollup(unit)
+            if unit == "M":
+                labels = days.astype("datetime64[M]").astype(str)
+            else:
+                # weeks by their first day, like daily labels
+                labels = np.array([day[5:] for day in days.astype(str)], dtype=str)
+        else:
+            times, values = downsample(series.times, series.values, max_points)
+            labels = np.array([time[5:] for time in times], dtype=str)  # 只取日期的天数
+        chart_series[name] = (labels, values)
+        nbytes += labels.nbytes + values.nbytes
+
+    _series_cache.set(key, chart_series, nbytes)
+    return chart_series
+
+
+def _page_spec():
+    layers = [
+        {
+            "transform": [{"filter": {"field": "series", "equal": label}}],
+            "mark": {"type": mark, "tooltip": True},
+            "encoding": {
+                "x": {"field": "日期", "type": "ordinal", "sort": None, "axis": {"labelAngle": -45}},
+                "y": {"field": "value", "type": "quantitative", "title": None},
+            },
+        }
+        for label, mark in SERIES_MARKS.values()
+    ]
+    return {
+        "facet": {
+            "row": {"field": "card", "type": "nominal", "sort": {"field": "order"},
+                    "header": {"labelAngle": 0, "labelAlign": "left", "title": None}},
+            "column": {"field": "series", "type": "nominal", "sort": [label for label, _ in SERIES_MARKS.values()],
+                       "header": {"title": None}},
+        },
+        "spec": {"width": FACET_WIDTH, "height": FACET_HEIGHT, "layer": layers},
+        "resolve": {"scale": {"x": "independent", "y": "independent"}},
+    }
+
+
+def prepare_page_chart(items, date_range, max_points=MAX_POINTS):
+    """
+    return (table, spec) for st.vega_lite_chart covering all `items` of one
+    page, cached per date range, page and item data versions
+    """
+    key = (date_range, tuple((item.id, item.data_version) for item in items), max_points)
+    page_chart = _page_cache.get(key)
+    if page_chart is not None:
+        return page_chart
+
+    columns = {"card": [], "order": [], "series": [], "日期": [], "value": []}
+    for order, item in enumerate(items):
+        card = f"{order + 1}. {item.title}"
+        for name, (labels, values) in prepare_chart_data(item, max_points).items():
+            if name not in SERIES_MARKS:
+                continue
+            columns["card"] += [card] * len(values)
+            columns["order"] += [order] * len(values)
+            columns["series"] += [SERIES_MARKS[name][0]] * len(values)
+            columns["日期"] += labels.tolist()
+            columns["value"] += values.tolist()
+
+    table = pd.DataFrame(columns)
+    # repeated labels go over the wire once as Arrow dictionaries
+    for column in ("card", "series", "日期"):
+        table[column] = table[column].astype("category")
+    table["order"] = table["order"].astype(np.int16)
+    page_chart = (table, _page_spec())
+    _page_cache.set(key, page_chart, int(table.memory_usage(deep=True).sum()))
+    return page_chart
@@ -0,0 +1,143 @@
+"""
+decode streamed chat responses into text chunks
+
+The /{item_id}/chat endpoint may answer a streaming request with server-sent
+events, newline-delimited JSON or plain chunked text. Backends that do not
+support streaming still answer with the usual {"response": ...} JSON body.
+"""
+import json
+
+SSE_DONE = "[DONE]"
+_TEXT_KEYS = ("token", "delta", "content", "text", "response")
+
+
+def _chunk_text(payload):
+    """
+    pull the text out of one decoded event payload
+    """
+    if isinstance(payload, str):
+        return payload
+    if not isinstance(payload, dict):
+        return ""
+    if payload.get("choices"):
+        choice = payload["choices"][0]
+        delta = choice.get("delta") or choice.get("message") or {}
+        return delta.get("content") or ""
+    for key in _TEXT_KEYS:
+        value = payload.get(key)
+        if isinstance(value, str):
+            return value
+    return ""
+
+
+def _decode_data(data):
+    try:
+        return _chunk_text(json.loads(data))
+    except ValueError:
+        return data
+
+
+def iter_sse(lines):
+    """
+    yield text chunks from the lines of a text/event-stream body
+    """
+    data_lines = []
+    for line in lines:
+        if line.startswith("data:"):
+            value = line[5:]
+            data_lines.append(value[1:] if value.startswith(" ") else value)
+        elif line == "" and data_lines:
+            data = "\n".join(data_lines)
+            data_lines = []
+            if data == SSE_DONE:
+                return
+            yield _decode_data(data)
+    if data_lines:
+        data = "\n".join(data_lines)
+        if data != SSE_DONE:
+            yield _decode_data(data)
+
+
+def iter_ndjson(lines):
+    for line in lines:
+        if line.strip():
+            yield _decode_data(line)
+
+
+def iter_response_text(response):
+    """
+    yield text chunks from a requests response opened with stream=True
+    """
+    response.encoding = 'utf-8'
+    content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+
+    if content_type == "text/event-stream":
+        chunks = iter_sse(response.iter_lines(decode_unicode=True))
+    elif content_type in ("application/x-ndjson", "application/jsonl"):
+        chunks = iter_ndjson(response.iter_lines(decode_unicode=True))
+    elif content_type == "application/json":
+        # non-streaming backend: the whole answer arrives at once
+        chunks = iter([_chunk_text(response.json())])
+    else:
+        chunks = response.iter_content(chunk_size=None, decode_unicode=True)
+
+    for chunk in chunks:
+        if chunk:
+            yield chunk
+
+
+FINAL_ANSWER_MARKER = "\nFinal Answer: "
+
+
+class FinalAnswerParser:
+    """
+    split a streamed ReAct-style completion into reasoning and final answer
+
+    feed() returns the answer text that became available with each chunk, so
+    the answer can be shown as soon as the marker has streamed past, even when
+    the marker itself is split across chunks.
+    """
+
+    def __init__(self, marker=FINAL_ANSWER_MARKER):
+        self.marker = marker
+        self.reasoning = ""
+        self.answer = ""
+        self.found = False
+        self._pending = ""
+
+    def feed(self, chunk):
+        if self.found:
+            if not self.answer:
+                chunk = chunk.lstrip()
+            self.answer += chunk
+            return chunk
+
+        text = self._pending + chunk
+        index = text.find(self.marker)
+        if index != -1:
+            self.reasoning += text[:index]
+            self._pending = ""
+            self.found = True
+            return self.feed(text[index + len(self.marker):])
+
+        # hold back the longest tail that could still grow into the marker
+        keep = 0
+        for size in range(min(len(self.marker) - 1, len(text)), 0, -1):
+            if self.marker.startswith(text[-size:]):
+                keep = size
+                break
+        self.reasoning += text[:len(text) - keep]
+        self._pending = text[len(text) - keep:]
+        return ""
+
+    def close(self):
+        """
+        flush the stream; without a marker the whole text is the answer
+        """
+        if not self.found:
+            self.answer = (self.reasoning + self._pending).strip()
+            self.reasoning = ""
+            self._pending = ""
+            return self.answer
+        self.answer = self.answer.rstrip()
+        return self.answer
@@ -0,0 +1,61 @@
+"""
+app settings from st.secrets, read once per process
+
+API calls used to look up st.secrets every time; settings() parses them into
+a Settings record on first use and hands out the same record until
+secrets.toml changes (or, under AppTest, the secrets object is swapped).
+"""
+import threading
+
+import streamlit as st
+
+_settings = None
+_source = None
+_lock = threading.Lock()
+
+
+class Settings:
+    __slots__ = ("list_api_url", "llm_api_url", "user_avatar", "assistant_avatar",
+                 "answer_cache", "extract_final_answer")
+
+    def __init__(self, list_api_url, llm_api_url, user_avatar=None, assistant_avatar=None,
+                 answer_cache=False, extract_final_answer=False):
+        self.list_api_url = list_api_url
+        self.llm_api_url = llm_api_url
+        self.user_avatar = user_avatar
+        self.assistant_avatar = assistant_avatar
+        self.answer_cache = answer_cache
+        self.extract_final_answer = extract_final_answer
+
+    @classmethod
+    def from_secrets(cls, secrets):
+        return cls(
+            list_api_url=secrets["LIST_API_URL"],
+            llm_api_url=secrets["NEW_NEW_LLM_API_URL"],
+            user_avatar=secrets.get("USER_AVATAR"),
+            assistant_avatar=secrets.get("ASSISTANT_AVATAR"),
+            # opt-in features
+            answer_cache=bool(secrets.get("ANSWER_CACHE", False)),
+            extract_final_answer=bool(secrets.get("EXTRACT_FINAL_ANSWER", False)),
+        )
+
+
+def _invalidate(*args, **kwargs):
+    global _settings
+    _settings = None
+
+
+def settings():
+    global _settings, _source
+    secrets = st.secrets
+    current = _settings
+    if current is not None and _source is secrets:
+        return current
+    with _lock:
+        if _settings is None or _source is not secrets:
+            if _source is not secrets:
+                # re-read after `streamlit run` notices an edited secrets.toml
+                secrets.file_change_listener.connect(_invalidate, weak=False)
+            _settings = Settings.from_secrets(secrets)
+            _source = secrets
+        return _settings
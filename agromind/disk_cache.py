@@ -0,0 +1,163 @@
+"""
+persistent SQLite cache shared by every Streamlit worker process
+
+Holds raw list segment responses and per-item chat transcripts so a restart
+or a new worker loads from disk instead of the farm backend. The database
+runs in WAL mode, so readers never block the single writer, and every
+process/thread keeps its own connection.
+
+The cache is best effort: any SQLite error is logged and treated as a miss.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.environ.get(
+    "AGROMIND_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "agromind.sqlite3"),
+)
+# approximate upper bound for all stored values
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# run the size check every this many writes per process
+EVICT_EVERY = 32
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace   TEXT NOT NULL,
+    key         TEXT NOT NULL,
+    value       BLOB NOT NULL,
+    nbytes      INTEGER NOT NULL,
+    stored_at   REAL NOT NULL,
+    expires_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at);
+CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires_at);
+"""
+
+
+class DiskCache:
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace, key, max_age=None):
+        """
+        stored value (bytes) or None when missing, expired or older than max_age
+        """
+        now = time.time()
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, stored_at FROM entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, now),
+            ).fetchone()
+            if row is None or (max_age is not None and now - row[1] > max_age):
+                return None
+            conn.execute(
+                "UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, key),
+            )
+            return bytes(row[0])
+        except sqlite3.Error:
+            logger.warning("disk cache read failed for %s/%s", namespace, key, exc_info=True)
+            return None
+
+    def set(self, namespace, key, value, ttl):
+        """
+        store bytes for ttl seconds
+        """
+        now = time.time()
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO entries "
+                "(namespace, key, value, nbytes, stored_at, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (namespace, key, sqlite3.Binary(value), len(value), now, now + ttl, now),
+            )
+        except sqlite3.Error:
+            logger.warning("disk cache write failed for %s/%s", namespace, key, exc_info=True)
+            return
+
+        with self._writes_lock:
+            self._writes += 1
+            due = self._writes % EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def touch(self, namespace, key, ttl):
+        """
+        mark a stored value as fresh again, e.g. after the server answered 304
+        """
+        now = time.time()
+        try:
+            self._connection().execute(
+                "UPDATE entries SET stored_at = ?, expires_at = ?, accessed_at = ? "
+                "WHERE namespace = ? AND key = ?",
+                (now, now + ttl, now, namespace, key),
+            )
+        except sqlite3.Error:
+            logger.warning("disk cache touch failed for %s/%s", namespace, key, exc_info=True)
+
+    def delete(self, namespace, key):
+        try:
+            self._connection().execute(
+                "DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+            )
+        except sqlite3.Error:
+            logger.warning("disk cache delete failed for %s/%s", namespace, key, exc_info=True)
+
+    def evict(self):
+        """
+        drop expired entries, then least recently used ones above max_bytes
+        """
+        try:
+            conn = self._connection()
+            conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+            total = conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            excess = total - self.max_bytes
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT namespace, key, nbytes FROM entries ORDER BY accessed_at"
+                ).fetchall()
+                doomed = []
+                for namespace, key, nbytes in rows:
+                    if excess <= 0:
+                        break
+                    doomed.append((namespace, key))
+                    excess -= nbytes
+                conn.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", doomed)
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error:
+            logger.warning("disk cache eviction failed", exc_info=True)
+
+
+# one store per process, each thread opens its own connection lazily
+store = DiskCache()
@@ -0,0 +1,278 @@
+"""
+process-wide per-item chat history cache with incremental sync
+
+Histories hold the messages the server has confirmed, plus local ones the
+server never saw (answers served from answer_cache), each pinned after the
+server message it followed. A sync asks for the server messages after the
+last known index (and sends the stored validators, ETag /
+Last-Modified, so an unchanged history costs a 304); it falls back to a full
+fetch when the server's answer does not line up with the cache.
+
+fetch(since, validators) must return (status_code, payload, validators) where
+validators is a dict of response validators and payload is
+either the full history list or {"since": n, "messages": [...]} for the
+messages from index n on.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from . import disk_cache
+from . import single_flight
+
+logger = logging.getLogger(__name__)
+
+# items whose histories are kept in memory
+MAX_ITEMS = 256
+# upper bound on concurrent background prefetches
+PREFETCH_WORKERS = 4
+# seconds to wait for an in-flight prefetch before syncing directly
+PREFETCH_WAIT = 5
+# seconds a transcript is kept in the persistent store
+DISK_TTL = 7 * 24 * 3600
+
+
+class _ItemHistory:
+    __slots__ = ("messages", "validators", "synced_at", "local")
+
+    def __init__(self, messages, validators, synced_at, local=()):
+        self.messages = messages
+        self.validators = validators
+        self.synced_at = synced_at
+        # [(number of server messages before it, message), ...]
+        self.local = list(local)
+
+    def view(self):
+        """
+        server messages with the local ones merged in
+        """
+        messages = list(self.messages)
+        # back to front, so earlier positions are not shifted yet
+        for after, message in reversed(self.local):
+            messages.insert(min(after, len(messages)), message)
+        return messages
+
+
+def _message(msg):
+    message = {"role": msg["role"], "content": msg["content"]}
+    if msg.get("cached"):
+        # answered from answer_cache, shown with a caption
+        message["cached"] = True
+    return message
+
+
+class HistoryCache:
+    """
+    in-memory LRU of transcripts, optionally backed by a disk_cache.DiskCache
+    """
+
+    def __init__(self, max_items=MAX_ITEMS, store=None):
+        self.max_items = max_items
+        self.store = store
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = single_flight.SingleFlight()
+        self.counters = single_flight.Counters()
+
+    def __contains__(self, item_id):
+        return item_id in self._items
+
+    def expire(self, item_id):
+        """
+        force the next sync to ask the server, keeping messages for the
+        incremental request
+        """
+        with self._lock:
+            entry = self._items.get(item_id)
+            if entry is not None:
+                entry.synced_at = float("-inf")
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def sync(self, item_id, fetch, max_age=0):
+        """
+        bring item_id up to date with the server and return its messages;
+        histories synced less than max_age seconds ago are returned as is,
+        and concurrent syncs of the same item share one round trip
+        """
+        with self._lock:
+            entry = self._items.get(item_id)
+        if entry is not None and time.monotonic() - entry.synced_at < max_age:
+            self.counters.add(hits=1)
+            return entry.view()
+
+        entry, shared = self._flight.do(item_id, lambda: self._sync(item_id, fetch))
+        if shared:
+            self.counters.add(coalesced=1)
+        return entry.view()
+
+    def record(self, item_id, messages):
+        """
+        add messages the server never saw to item_id's history, after the
+        server messages known so far; sync first so that count is current
+        """
+        with self._lock:
+            entry = self._items.get(item_id)
+        if entry is None:
+            entry = self._load(item_id) or _ItemHistory([], None, float("-inf"))
+        with self._lock:
+            entry = self._items.get(item_id, entry)
+            after = len(entry.messages)
+            # a new list, so a concurrent _save never sees it half-written
+            entry.local = entry.local + [(after, _message(msg)) for msg in messages]
+            self._put(item_id, entry)
+        self._save(item_id, entry)
+
+    def stats(self):
+        stats = self.counters.snapshot()
+        stats.update(entries=len(self._items))
+        return stats
+
+    def _sync(self, item_id, fetch):
+        with self._lock:
+            entry = self._items.get(item_id)
+        if entry is None:
+            # transcript kept by an earlier process; still revalidated below
+            entry = self._load(item_id)
+        since = len(entry.messages) if entry else 0
+        validators = entry.validators if entry else None
+
+        status, payload, new_validators = fetch(since, validators)
+        if status == 304 and entry is not None:
+            self.counters.add(hits=1)
+            with self._lock:
+                # an entry recorded into during the fetch wins over the disk copy
+                entry = self._items.get(item_id, entry)
+                entry.synced_at = time.monotonic()
+                self._put(item_id, entry)
+            return entry
+
+        self.counters.add(misses=1)
+        messages = self._merge(entry, since, payload)
+        if messages is None:
+            # cache no longer lines up with the server, start over
+            status, payload, new_validators = fetch(0, None)
+            messages = self._merge(None, 0, payload) or []
+
+        with self._lock:
+            # keep local messages, including ones recorded during the fetch
+            current = self._items.get(item_id, entry)
+            entry = _ItemHistory(messages, new_validators, time.monotonic(), current.local if current else ())
+            self._put(item_id, entry)
+        self._save(item_id, entry)
+        return entry
+
+    def _put(self, item_id, entry):
+        # caller holds self._lock
+        self._items[item_id] = entry
+        self._items.move_to_end(item_id)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def _load(self, item_id):
+        if self.store is None:
+            return None
+        raw = self.store.get("history", str(item_id))
+        if raw is None:
+            return None
+        try:
+            stored = json.loads(raw)
+            messages = [_message(msg) for msg in stored["messages"]]
+            local = [(int(after), _message(msg)) for after, msg in stored.get("local", ())]
+        except (ValueError, KeyError, TypeError):
+            self.store.delete("history", str(item_id))
+            return None
+        validators = stored.get("validators")
+        if validators is None and stored.get("etag"):
+            # written before Last-Modified was kept
+            validators = {"ETag": stored["etag"]}
+        return _ItemHistory(messages, validators, float("-inf"), local)
+
+    def _save(self, item_id, entry):
+        if self.store is None:
+            return
+        raw = json.dumps({
+            "messages": entry.messages,
+            "validators": entry.validators,
+            "local": entry.local,
+        }, ensure_ascii=False).encode("utf-8")
+        self.store.set("history", str(item_id), raw, DISK_TTL)
+
+    @staticmethod
+    def _merge(entry, since, payload):
+        if payload is None:
+            return []
+        if isinstance(payload, list):
+            # server sent the full history
+            return [_message(msg) for msg in payload]
+        if isinstance(payload, dict) and payload.get("since") == since:
+            known = entry.messages if entry else []
+            return known + [_message(msg) for msg in payload.get("messages", [])]
+        return None
+
+
+def _prefetch_one(cache, item_id, fetch):
+    try:
+        cache.sync(item_id, fetch)
+    except Exception:
+        logger.info("history prefetch failed for %s", item_id, exc_info=True)
+    finally:
+        with _inflight_lock:
+            _inflight.pop(item_id, None)
+
+
+def prefetch(item_ids, fetch_for, cache=None):
+    """
+    sync the histories of item_ids on the background pool
+
+    fetch_for(item_id) returns the fetch callable for that item. Items that
+    are already cached or being prefetched are skipped. Returns the submitted
+    futures so the caller can cancel the ones that have not started yet.
+    """
+    if cache is None:
+        cache = histories
+    futures = []
+    with _inflight_lock:
+        for item_id in item_ids:
+            if item_id in cache or item_id in _inflight:
+                continue
+            future = _prefetch_pool.submit(_prefetch_one, cache, item_id, fetch_for(item_id))
+            _inflight[item_id] = future
+            futures.append(future)
+    return futures
+
+
+def cancel_prefetch(futures):
+    for future in futures:
+        future.cancel()
+    # cancelled futures never run _prefetch_one, so clear their slots here
+    with _inflight_lock:
+        for item_id, future in list(_inflight.items()):
+            if future.cancelled():
+                del _inflight[item_id]
+
+
+def wait_for_prefetch(item_id, timeout=PREFETCH_WAIT):
+    """
+    let a running prefetch of item_id finish instead of fetching twice
+    """
+    with _inflight_lock:
+        future = _inflight.get(item_id)
+        if future is not None and future.cancel():
+            # still queued behind other prefetches, the caller syncs directly
+            del _inflight[item_id]
+            return
+    if future is not None:
+        wait([future], timeout=timeout)
+
+
+# transcripts of every item opened in this process
+histories = HistoryCache(store=disk_cache.store)
+_prefetch_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="history-prefetch")
+_inflight = {}
+_inflight_lock = threading.Lock()
@@ -0,0 +1,109 @@
+"""
+process-wide pooled HTTP session shared by every API call
+
+Keeping one requests.Session per process reuses TCP/TLS connections across
+reruns and sessions instead of handshaking on every call.
+"""
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeouts in seconds per endpoint
+TIMEOUTS = {
+    "list": (3.05, 20),
+    "history": (3.05, 20),
+    "chat": (3.05, 180),
+}
+DEFAULT_TIMEOUT = (3.05, 30)
+
+# retries only apply to idempotent calls
+MAX_RETRIES = 2
+BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+# response validator -> conditional request header
+CONDITIONAL_HEADERS = {
+    "ETag": "If-None-Match",
+    "Last-Modified": "If-Modified-Since",
+}
+
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 32
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update({
+                    "Accept-Encoding": "gzip, deflate",
+                    "Connection": "keep-alive",
+                })
+                _session = session
+    return _session
+
+
+def request(method, url, endpoint=None, idempotent=None, **kwargs):
+    """
+    send a request through the shared session
+
+    endpoint selects the timeout from TIMEOUTS; idempotent defaults to the
+    HTTP method semantics and can be forced for read-only POSTs
+    """
+    method = method.upper()
+    if idempotent is None:
+        idempotent = method in IDEMPOTENT_METHODS
+    kwargs.setdefault("timeout", TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT))
+    attempts = 1 + (MAX_RETRIES if idempotent else 0)
+    session = get_session()
+
+    for attempt in range(attempts):
+        last_attempt = attempt == attempts - 1
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if last_attempt:
+                raise
+            logger.info("retrying %s %s after connection error", method, url)
+        else:
+            if last_attempt or response.status_code not in RETRY_STATUSES:
+                return response
+            logger.info("retrying %s %s after HTTP %s", method, url, response.status_code)
+            response.close()
+        time.sleep(BACKOFF_FACTOR * (2 ** attempt))
+
+
+def get(url, endpoint=None, **kwargs):
+    return request("GET", url, endpoint=endpoint, **kwargs)
+
+
+def post(url, endpoint=None, **kwargs):
+    return request("POST", url, endpoint=endpoint, **kwargs)
+
+
+def validators(response):
+    """
+    the response's cache validators (ETag / Last-Modified), to store with the body
+    """
+    return {name: response.headers[name] for name in CONDITIONAL_HEADERS if response.headers.get(name)}
+
+
+def conditional_headers(validators):
+    """
+    request headers that let the server answer 304 when stored validators still match
+    """
+    return {CONDITIONAL_HEADERS[name]: value for name, value in (validators or {}).items()
+            if name in CONDITIONAL_HEADERS and value}
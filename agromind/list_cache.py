@@ -0,0 +1,354 @@
+"""
+process-wide cache for list_api results
+
+Streamlit re-executes main.py on every interaction, but imported modules stay
+loaded, so the cache instance below survives reruns and is shared by sessions.
+"""
+import datetime
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from . import single_flight
+
+logger = logging.getLogger(__name__)
+
+# seconds before an entry is considered stale and refreshed in the background
+DEFAULT_TTL = 300
+# seconds a stale entry may still be served while it is being refreshed
+DEFAULT_STALE_TTL = 3600
+# approximate upper bound for all cached payloads
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# days that are fully in the past rarely change upstream
+HISTORIC_TTL = 6 * 3600
+# longest date range fetched in one list request
+MAX_SEGMENT_DAYS = 31
+# upper bound on concurrent segment requests
+SEGMENT_FETCH_WORKERS = 8
+# upper bound on concurrent background refreshes of stale entries
+REFRESH_WORKERS = 2
+
+# seconds data derived from list items (chart series, indexes) is kept
+DERIVED_TTL = 24 * 3600
+# approximate upper bound for each cache of derived data
+DERIVED_MAX_BYTES = 32 * 1024 * 1024
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+
+def parse_date(value):
+    """
+    date / datetime / 'YYYY-M-D' string -> date
+    """
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    year, month, day = (int(part) for part in str(value).strip().split("-"))
+    return datetime.date(year, month, day)
+
+
+def normalize_date(value):
+    """
+    date / datetime / 'YYYY-M-D' string -> zero-padded 'YYYY-MM-DD'
+    """
+    return parse_date(value).isoformat()
+
+
+def normalize_range(start_date, end_date):
+    return normalize_date(start_date), normalize_date(end_date)
+
+
+class _Entry:
+    __slots__ = ("value", "nbytes", "stored_at", "ttl")
+
+    def __init__(self, value, nbytes, stored_at, ttl):
+        self.value = value
+        self.nbytes = nbytes
+        self.stored_at = stored_at
+        self.ttl = ttl
+
+
+class TTLCache:
+    """
+    LRU cache with per-entry TTL, a byte budget and stale-while-revalidate
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, stale_ttl=DEFAULT_STALE_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._flight = single_flight.SingleFlight()
+        self.counters = single_flight.Counters()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def lookup(self, key):
+        """
+        return (value, state) where state is FRESH, STALE or MISS
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, MISS
+            age = now - entry.stored_at
+            if age > entry.ttl + self.stale_ttl:
+                self._drop(key)
+                return None, MISS
+            self._entries.move_to_end(key)
+            return entry.value, FRESH if age <= entry.ttl else STALE
+
+    def states(self):
+        """
+        [(key, FRESH or STALE)] for every live entry, without touching LRU order
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (key, FRESH if now - entry.stored_at <= entry.ttl else STALE)
+                for key, entry in self._entries.items()
+                if now - entry.stored_at <= entry.ttl + self.stale_ttl
+            ]
+
+    def size_of(self, key):
+        entry = self._entries.get(key)
+        return entry.nbytes if entry is not None else 0
+
+    def get(self, key, default=None):
+        value, state = self.lookup(key)
+        return default if state == MISS else value
+
+    def set(self, key, value, nbytes=0, ttl=None):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if nbytes > self.max_bytes:
+                # never let a single oversized payload flush the whole cache
+                return
+            self._entries[key] = _Entry(value, nbytes, time.monotonic(), self.ttl if ttl is None else ttl)
+            self._total_bytes += nbytes
+            while self._total_bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self):
+        stats = self.counters.snapshot()
+        stats.update(entries=len(self._entries), bytes=self._total_bytes)
+        return stats
+
+    def load(self, key, fetch, ttl=None):
+        """
+        fetch and store key; concurrent loads of the same key share one fetch()
+        """
+        def fetch_and_set():
+            value, state = self.lookup(key)
+            if state == FRESH:
+                # another caller finished loading it since our lookup
+                return value
+            value, nbytes = fetch()
+            self.set(key, value, nbytes, ttl)
+            return value
+
+        value, shared = self._flight.do(key, fetch_and_set)
+        if shared:
+            self.counters.add(coalesced=1)
+        else:
+            self.counters.add(misses=1)
+        return value
+
+    def get_or_fetch(self, key, fetch, ttl=None):
+        """
+        fetch() must return (value, nbytes) and may raise; it is called
+        synchronously on a miss and from a background thread when stale
+        """
+        value, state = self.lookup(key)
+        if state == FRESH:
+            self.counters.add(hits=1)
+            return value
+        if state == STALE:
+            self.counters.add(hits=1)
+            self.refresh_async(key, fetch, ttl)
+            return value
+        return self.load(key, fetch, ttl)
+
+    def refresh_async(self, key, fetch, ttl=None):
+        """
+        reload key on the shared refresh pool, at most once at a time per key
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        _refresh_pool.submit(self._refresh, key, fetch, ttl)
+
+    def _refresh(self, key, fetch, ttl):
+        try:
+            self.load(key, fetch, ttl)
+        except Exception:
+            # keep serving the stale entry; the next rerun will retry
+            logger.warning("background refresh failed for %s", key, exc_info=True)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry.nbytes
+
+
+def segment_range(start_date, end_date, days=MAX_SEGMENT_DAYS):
+    """
+    split an inclusive date range into consecutive (start, end) date segments
+    """
+    start, end = parse_date(start_date), parse_date(end_date)
+    step = datetime.timedelta(days=days)
+    segments = []
+    while start <= end:
+        segment_end = min(start + step - datetime.timedelta(days=1), end)
+        segments.append((start, segment_end))
+        start = segment_end + datetime.timedelta(days=1)
+    return segments
+
+
+def plan_segments(start_date, end_date, cache=None, today=None):
+    """
+    segments covering [start_date, end_date] with as few list requests as possible
+
+    Cached segments that lie inside the range are reused, fresh ones first;
+    each run of days none of them covers becomes one new segment (at most
+    MAX_SEGMENT_DAYS long, and split at today, which expires sooner). A
+    segment sticking out of the range is not reused: its extra cards cannot be
+    told apart from the range's own.
+    """
+    if cache is None:
+        cache = list_results
+    start, end = parse_date(start_date), parse_date(end_date)
+    today = today or datetime.date.today()
+    lo, hi = start.isoformat(), end.isoformat()
+    inside = []
+    for key, state in cache.states():
+        if isinstance(key, tuple) and len(key) == 2 and lo <= key[0] and key[1] <= hi:
+            inside.append((state != FRESH, (parse_date(key[0]), parse_date(key[1]))))
+    # fresh before stale, longest first, so few segments cover the range
+    inside.sort(key=lambda entry: (entry[0], entry[1][0] - entry[1][1], entry[1]))
+    segments = []
+    covered = set()
+    for _, segment in inside:
+        days = set(range(segment[0].toordinal(), segment[1].toordinal() + 1))
+        if days <= covered:
+            continue
+        covered |= days
+        segments.append(segment)
+
+    run_start = None
+    for ordinal in range(start.toordinal(), end.toordinal() + 2):
+        day = datetime.date.fromordinal(ordinal)
+        if run_start is not None and (
+            ordinal in covered or day > end or day == today
+            or ordinal - run_start.toordinal() >= MAX_SEGMENT_DAYS
+        ):
+            segments.append((run_start, day - datetime.timedelta(days=1)))
+            run_start = None
+        if run_start is None and ordinal not in covered and day <= end:
+            run_start = day
+    return sorted(segments)
+
+
+def segment_key(segment):
+    return segment[0].isoformat(), segment[1].isoformat()
+
+
+def segment_ttl(segment, today=None):
+    today = today or datetime.date.today()
+    return HISTORIC_TTL if segment[1] < today else None
+
+
+def fetch_segments(segments, fetch, cache=None, states=None):
+    """
+    return the cached result for every segment, fetching only the missing ones
+
+    fetch(start, end) must return (items, nbytes); missing segments are
+    fetched concurrently (sharing in-flight fetches with other sessions) and
+    stale ones are served while being refreshed. The FRESH / STALE / MISS
+    state of each segment is appended to `states` when given
+    """
+    if cache is None:
+        cache = list_results
+    results = {}
+    missing = []
+    for segment in segments:
+        key = segment_key(segment)
+        value, state = cache.lookup(key)
+        if states is not None:
+            states.append(state)
+        if state == MISS:
+            missing.append((segment, key))
+            continue
+        cache.counters.add(hits=1)
+        if state == STALE:
+            cache.refresh_async(key, lambda segment=segment: fetch(*segment), segment_ttl(segment))
+        results[segment] = value
+
+    futures = [
+        (segment, _segment_pool.submit(cache.load, key, lambda segment=segment: fetch(*segment), segment_ttl(segment)))
+        for segment, key in missing
+    ]
+    for segment, future in futures:
+        results[segment] = future.result()
+
+    return [results[segment] for segment in segments]
+
+
+def merge_segments(segment_results):
+    """
+    concatenate segment results in order, dropping items already seen by id
+    """
+    seen = set()
+    merged = []
+    for items in segment_results:
+        for item in items or ():
+            if item.id in seen:
+                continue
+            seen.add(item.id)
+            merged.append(item)
+    return merged
+
+
+def derived_cache():
+    """
+    cache for values computed from list items; never served stale, since
+    keys include the item's data version
+    """
+    return TTLCache(ttl=DERIVED_TTL, stale_ttl=0, max_bytes=DERIVED_MAX_BYTES)
+
+
+# list_api results by segment
+list_results = TTLCache()
+_segment_pool = ThreadPoolExecutor(max_workers=SEGMENT_FETCH_WORKERS, thread_name_prefix="list-segment")
+# stale entries wait here instead of each starting a thread, a long stale
+# range must not fire all of its refreshes at the backend at once
+_refresh_pool = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix="cache-refresh")
@@ -0,0 +1,112 @@
+"""
+list API fetching and parsing, independent of Streamlit
+
+Used by the dashboard through list_cache and directly by the report export
+CLI. Nothing here touches st.*, so it runs on worker threads and outside a
+Streamlit script alike.
+"""
+import json
+
+import requests
+
+from . import disk_cache
+from . import http_client
+from . import list_cache
+from . import models
+from . import tracing
+
+
+class InvalidListResponse(requests.exceptions.RequestException):
+    """
+    a 200 reply that is not a list of cards (gateway error page, cut-off body)
+    """
+
+
+def api_date(day):
+    return f"{day.year}-{day.month}-{day.day}"
+
+
+def segment_url(base_url, start, end):
+    return f"{base_url}{api_date(start)}/{api_date(end)}"
+
+
+def list_contents(api_data):
+    return [models.ListItem.from_api(item) for item in api_data or []]
+
+
+def parse_list(raw, key=None):
+    """
+    response bytes -> ListItems; raises InvalidListResponse when unreadable
+    """
+    with tracing.span("parse", segment=key, bytes=len(raw)) as span:
+        try:
+            contents = list_contents(models.loads(raw))
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise InvalidListResponse(f"unreadable list response: {e!r}") from e
+        span.set(items=len(contents))
+    return contents
+
+
+def list_validators(key):
+    """
+    ETag / Last-Modified stored with a cached list segment
+    """
+    raw = disk_cache.store.get("list_validators", key)
+    try:
+        return json.loads(raw) if raw else None
+    except ValueError:
+        return None
+
+
+def fetch_list(url, key=None, ttl=list_cache.DEFAULT_TTL):
+    """
+    return (items, nbytes) for one list request; raw responses are shared with
+    other worker processes through the disk cache
+    """
+    contents = None
+    with tracing.span("fetch_list", segment=key, cache="disk") as span:
+        raw = disk_cache.store.get("list", key, max_age=ttl) if key else None
+        if raw is None:
+            # an expired copy is revalidated instead of downloaded again
+            stale = disk_cache.store.get("list", key) if key else None
+            validators = list_validators(key) if stale is not None else None
+            response = http_client.get(url, endpoint="list", headers=http_client.conditional_headers(validators))
+            response.raise_for_status()
+            span.add_bytes(len(response.content))
+            if response.status_code == 304 and stale is not None:
+                span.set(cache="revalidated")
+                raw = stale
+                disk_cache.store.touch("list", key, ttl + list_cache.DEFAULT_STALE_TTL)
+                disk_cache.store.touch("list_validators", key, ttl + list_cache.DEFAULT_STALE_TTL)
+            else:
+                span.set(cache="miss")
+                raw = response.content
+                # parsed before it is stored, a bad reply must not outlive this request
+                contents = parse_list(raw, key)
+                if key:
+                    disk_cache.store.set("list", key, raw, ttl + list_cache.DEFAULT_STALE_TTL)
+                    disk_cache.store.set("list_validators", key,
+                                         json.dumps(http_client.validators(response)).encode("utf-8"),
+                                         ttl + list_cache.DEFAULT_STALE_TTL)
+    if contents is None:
+        # parse once here, the cache keeps the typed records
+        try:
+            contents = parse_list(raw, key)
+        except InvalidListResponse:
+            # damaged disk copy: drop it so the next call downloads the segment
+            disk_cache.store.delete("list", key)
+            disk_cache.store.delete("list_validators", key)
+            raise
+    return contents, len(raw)
+
+
+def fetch_segment(base_url, start, end):
+    """
+    fetch_list for one list_cache segment, cached on disk under the segment key
+    """
+    segment = (start, end)
+    return fetch_list(
+        segment_url(base_url, start, end),
+        "/".join(list_cache.segment_key(segment)),
+        list_cache.segment_ttl(segment) or list_cache.DEFAULT_TTL
+    )
@@ -0,0 +1,257 @@
+"""
+background execution of LLM requests
+
+The script thread submits a request and gets an LLMJob handle back; the
+answer is streamed into the handle by a worker thread, and the question
+screen polls it. Leaving the screen cancels a job that has not started yet
+and detaches a running one, which still completes so the reply ends up in
+the item's server-side history. A detached job no longer counts against its
+session's share of the slots, so the session's next question is not queued
+behind it.
+
+Requests are admitted by one process-wide controller: at most
+MAX_IN_FLIGHT run against the backend at once, the rest wait in a single FIFO
+queue shared by every session, and no session holds more than
+MAX_PER_SESSION of the running slots, so a burst from one user cannot starve
+the others. A queued job knows its position and an estimated wait.
+
+With a chat_stream.FinalAnswerParser the job splits a ReAct-style completion:
+`text` only grows once the final answer starts streaming, and the thoughts
+before it are kept in `reasoning`.
+"""
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from . import tracing
+
+logger = logging.getLogger(__name__)
+
+# upper bound on LLM requests running at once in this process
+MAX_IN_FLIGHT = int(os.environ.get("AGROMIND_LLM_MAX_IN_FLIGHT", 4))
+# running requests one session may hold; its further requests keep their place in the queue
+MAX_PER_SESSION = int(os.environ.get("AGROMIND_LLM_MAX_PER_SESSION", 1))
+# weight of the latest request in the moving average of request durations
+SERVICE_TIME_SMOOTHING = 0.2
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class LLMJob:
+
+    def __init__(self, item_id, prompt, session=None):
+        self.item_id = item_id
+        self.prompt = prompt
+        self.session = session
+        self.status = QUEUED
+        self.text = ""
+        self.reasoning = ""
+        self.error = None
+        self.detached = False
+        self.future = None
+        self.submitted_at = time.perf_counter()
+        # answered from answer_cache without calling the backend
+        self.cached = False
+        self._lock = threading.Lock()
+
+    def done(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def cancel(self):
+        """
+        drop the job if it has not started, otherwise stop waiting for it
+        """
+        with self._lock:
+            self.detached = True
+            if self.status == QUEUED and admission.withdraw(self):
+                self.status = CANCELLED
+                return
+        admission.detach(self)
+
+    def queue_position(self):
+        """
+        (1-based position in the admission queue, estimated seconds of wait or
+        None) while queued, otherwise None
+        """
+        return admission.position(self)
+
+    def _run(self, stream, on_complete, parser):
+        with self._lock:
+            if self.status == CANCELLED:
+                return
+            self.status = RUNNING
+        start = time.perf_counter()
+        queued = start - self.submitted_at
+        first_chunk = None
+        try:
+            for chunk in stream():
+                if first_chunk is None:
+                    first_chunk = time.perf_counter() - start
+                if parser is None:
+                    self.text += chunk
+                    continue
+                self.text += parser.feed(chunk)
+                self.reasoning = parser.reasoning
+            if parser is not None:
+                self.text = parser.close()
+                self.reasoning = parser.reasoning
+            self.status = DONE
+        except Exception as e:
+            logger.info("LLM request for %s failed", self.item_id, exc_info=True)
+            self.error = e
+            self.status = FAILED
+        finally:
+            tracing.record(
+                "llm_api",
+                time.perf_counter() - start,
+                item_id=self.item_id,
+                status=self.status,
+                bytes=len(self.text.encode('utf-8')),
+                ttft_ms=None if first_chunk is None else round(first_chunk * 1000, 3),
+                queue_ms=round(queued * 1000, 3),
+            )
+            if on_complete is not None:
+                try:
+                    on_complete(self)
+                except Exception:
+                    logger.warning("LLM completion callback failed for %s", self.item_id, exc_info=True)
+
+
+class AdmissionController:
+    """
+    FIFO queue in front of a fixed number of LLM request slots
+    """
+
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT, max_per_session=MAX_PER_SESSION):
+        self.max_in_flight = max_in_flight
+        self.max_per_session = max_per_session
+        # moving average of request durations, for wait estimates
+        self.service_time = None
+        self._queue = deque()
+        self._in_flight = 0
+        self._per_session = {}
+        # admitted jobs that still count against their session
+        self._session_slots = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="llm")
+
+    def submit(self, job, stream, on_complete, parser):
+        with self._lock:
+            self._queue.append((job, stream, on_complete, parser))
+            self._dispatch()
+
+    def withdraw(self, job):
+        """
+        remove a job that is still waiting; False once it was admitted
+        """
+        with self._lock:
+            for entry in self._queue:
+                if entry[0] is job:
+                    self._queue.remove(entry)
+                    return True
+        return False
+
+    def detach(self, job):
+        """
+        give an admitted job's session slot back; the job itself keeps running
+        and still counts against max_in_flight
+        """
+        with self._lock:
+            if job in self._session_slots:
+                self._release_session(job)
+                self._dispatch()
+
+    def position(self, job):
+        with self._lock:
+            for index, entry in enumerate(self._queue):
+                if entry[0] is job:
+                    break
+            else:
+                return None
+            service_time = self.service_time
+        position = index + 1
+        if service_time is None:
+            return position, None
+        # every round of max_in_flight requests ahead costs about one request duration
+        return position, math.ceil(position / self.max_in_flight) * service_time
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": self._in_flight,
+                "queued": len(self._queue),
+                "max_in_flight": self.max_in_flight,
+                "service_time": self.service_time,
+            }
+
+    def _dispatch(self):
+        # caller holds self._lock; admit the oldest jobs whose session has room
+        for entry in list(self._queue):
+            if self._in_flight >= self.max_in_flight:
+                return
+            job = entry[0]
+            if self._per_session.get(job.session, 0) >= self.max_per_session:
+                continue
+            self._queue.remove(entry)
+            self._in_flight += 1
+            self._per_session[job.session] = self._per_session.get(job.session, 0) + 1
+            self._session_slots.add(job)
+            job.future = self._executor.submit(self._run, *entry)
+
+    def _run(self, job, stream, on_complete, parser):
+        start = time.perf_counter()
+        try:
+            job._run(stream, on_complete, parser)
+        finally:
+            duration = time.perf_counter() - start
+            with self._lock:
+                self._in_flight -= 1
+                if job in self._session_slots:
+                    self._release_session(job)
+                if job.status in (DONE, FAILED):
+                    if self.service_time is None:
+                        self.service_time = duration
+                    else:
+                        self.service_time += SERVICE_TIME_SMOOTHING * (duration - self.service_time)
+                self._dispatch()
+
+
+    def _release_session(self, job):
+        # caller holds self._lock
+        self._session_slots.discard(job)
+        self._per_session[job.session] -= 1
+        if not self._per_session[job.session]:
+            del self._per_session[job.session]
+
+
+def submit(item_id, prompt, stream, on_complete=None, parser=None, session=None):
+    """
+    queue stream() (an iterator of text chunks) for the worker pool; on_complete(job)
+    is called from the worker once the request finishes or fails
+    """
+    job = LLMJob(item_id, prompt, session)
+    admission.submit(job, stream, on_complete, parser)
+    return job
+
+
+def answered(item_id, prompt, text):
+    """
+    an already finished job holding a cached answer, handled like any other job
+    """
+    job = LLMJob(item_id, prompt)
+    job.text = text
+    job.cached = True
+    job.status = DONE
+    return job
+
+
+# one controller per process, shared by every session
+admission = AdmissionController()
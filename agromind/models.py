@@ -0,0 +1,91 @@
+"""
+typed records for list API items
+
+Each list response is parsed once at ingest time: the nested `data` JSON
+string becomes numpy-backed series, so reruns never touch raw JSON again.
+"""
+import json
+import zlib
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SERIES_NAMES = ('irrigation', 'tail')
+
+
+def loads(data):
+    """
+    decode JSON bytes / str, with orjson when it is installed
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class Series:
+    """
+    one chart series: raw time strings and float values (NaN for missing)
+    """
+    __slots__ = ('times', 'values')
+
+    def __init__(self, times, values):
+        self.times = times
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def nbytes(self):
+        return self.times.nbytes + self.values.nbytes
+
+    @classmethod
+    def from_points(cls, points):
+        """
+        [{'time': 'YYYY-MM-DD...', 'value': v}, ...] -> Series
+        """
+        times = np.array([point['time'] for point in points], dtype=str)
+        values = np.array([np.nan if point['value'] is None else point['value'] for point in points],
+                          dtype=np.float64)
+        return cls(times, values)
+
+
+class ListItem:
+    """
+    one card of the list API
+    """
+    __slots__ = ('id', 'date_range', 'title', 'content', 'series', 'data_version')
+
+    def __init__(self, id, date_range, title, content, series, data_version):
+        self.id = id
+        self.date_range = date_range
+        self.title = title
+        self.content = content
+        self.series = series
+        self.data_version = data_version
+
+    @property
+    def nbytes(self):
+        return sum(series.nbytes for series in self.series.values())
+
+    @classmethod
+    def from_api(cls, item):
+        raw = item.get('data')
+        data = raw
+        if isinstance(raw, str):
+            data = loads(raw) if raw else None
+            data_version = zlib.crc32(raw.encode('utf-8'))
+        else:
+            data_version = zlib.crc32(json.dumps(raw, sort_keys=True).encode('utf-8'))
+
+        series = {}
+        if data and isinstance(data, dict):
+            for name in SERIES_NAMES:
+                if name in data:
+                    series[name] = Series.from_points(data[name])
+
+        return cls(item['id'], item['range'], item['title'], item['content'], series, data_version)
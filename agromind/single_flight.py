@@ -0,0 +1,74 @@
+"""
+request coalescing: concurrent calls for the same key share one execution
+
+When many sessions miss the cache for the same key at once, only the first
+caller runs the upstream request; the others wait for and reuse its result
+(or its exception).
+"""
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """
+        run fn() once per key at a time; returns (value, shared) where shared
+        is True when the result came from another caller's execution
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value, False
+
+
+class Counters:
+    """
+    thread-safe hit / miss / coalesced counters for a shared cache
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+
+    def add(self, hits=0, misses=0, coalesced=0):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.coalesced += coalesced
+
+    def snapshot(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
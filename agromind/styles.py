@@ -0,0 +1,46 @@
+"""
+page stylesheet, served once as a static file instead of on every rerun
+
+static/agromind.css is served by Streamlit's static file serving
+(server.enableStaticServing in .streamlit/config.toml). Each rerun only sends
+a short script that adds a <link> to the page head once; the browser caches
+the file, keyed by a hash of its content. Without static serving the
+stylesheet is inlined as before.
+"""
+import functools
+import hashlib
+import os
+import pathlib
+
+import streamlit as st
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STYLESHEET = os.path.join(ROOT, "static", "agromind.css")
+# URL of files under static/, relative to the app page
+STATIC_URL = "app/static"
+
+
+@functools.lru_cache(maxsize=1)
+def _link_script():
+    with open(STYLESHEET, "rb") as f:
+        version = hashlib.sha1(f.read()).hexdigest()[:10]
+    name = os.path.basename(STYLESHEET)
+    return f"""<script>
+(() => {{
+    const id = "agromind-css-{version}";
+    if (document.getElementById(id)) return;
+    document.querySelectorAll("link[id^='agromind-css-']").forEach(old => old.remove());
+    const link = document.createElement("link");
+    link.id = id;
+    link.rel = "stylesheet";
+    link.href = "{STATIC_URL}/{name}?v={version}";
+    document.head.appendChild(link);
+}})();
+</script>"""
+
+
+def inject():
+    if st.get_option("server.enableStaticServing"):
+        st.html(_link_script(), unsafe_allow_javascript=True)
+    else:
+        st.html(pathlib.Path(STYLESHEET))
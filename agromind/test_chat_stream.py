@@ -0,0 +1,65 @@
+"""
+FinalAnswerParser against the whole-text extraction it replaced
+
+    python -m pytest agromind
+"""
+import random
+
+import pytest
+
+from agromind import chat_stream
+
+MARKER = chat_stream.FINAL_ANSWER_MARKER
+
+COMPLETIONS = [
+    "Thought: 查看灌溉数据\nAction: query\nFinal Answer: 灌溉量正常。",
+    "\nFinal Answer: 直接回答",
+    # near misses before the real marker
+    "Thought: \nFinal\nFinal Answer\nFinal Answer:x\n\nFinal Answer:  尾水比偏高  \n",
+    # only the first marker counts
+    "a\nFinal Answer: one\nFinal Answer: two",
+    "Thought: no marker here\nFinal Answer:",
+    "Thought: 没有最终答案",
+    "",
+]
+
+
+def extract(content):
+    # the str.find extraction test_llm.py used before the parser
+    index = content.find(MARKER)
+    if index == -1:
+        return None, content.strip()
+    return content[:index], content[index + len(MARKER):].strip()
+
+
+def split(text, rng):
+    chunks = []
+    while text:
+        size = rng.randint(1, 5)
+        chunks.append(text[:size])
+        text = text[size:]
+    return chunks
+
+
+@pytest.mark.parametrize("content", COMPLETIONS)
+def test_random_chunk_splits_match_whole_text(content):
+    reasoning, answer = extract(content)
+    rng = random.Random(content)
+    for _ in range(200):
+        parser = chat_stream.FinalAnswerParser()
+        streamed = "".join(parser.feed(chunk) for chunk in split(content, rng))
+        assert parser.close() == answer
+        assert parser.found == (reasoning is not None)
+        if parser.found:
+            assert parser.reasoning == reasoning
+            assert streamed.rstrip() == answer
+        else:
+            assert streamed == ""
+
+
+def test_answer_streams_once_marker_is_complete():
+    parser = chat_stream.FinalAnswerParser()
+    assert parser.feed("Thought: x\nFinal Ans") == ""
+    assert parser.feed("wer: ") == ""
+    assert parser.feed("灌溉") == "灌溉"
+    assert parser.reasoning == "Thought: x"
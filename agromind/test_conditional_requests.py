@@ -0,0 +1,162 @@
+"""
+conditional list and history requests against mock_backend
+
+    python -m pytest agromind
+"""
+import datetime
+
+import pytest
+import requests
+
+import mock_backend
+from agromind import app
+from agromind import disk_cache
+from agromind import history_cache
+from agromind import http_client
+from agromind import list_fetch
+
+DAY = datetime.date(2025, 6, 2)
+
+
+@pytest.fixture
+def backend():
+    backend = mock_backend.MockBackend(mock_backend.MockConfig(items=3, points=7, history=4))
+    backend.start()
+    yield backend
+    backend.stop()
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = disk_cache.DiskCache(str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(disk_cache, "store", store)
+    return store
+
+
+def _history_fetch(backend, item_id, calls):
+    url = f"{backend.url}/{item_id}/chat"
+
+    def fetch(since, validators):
+        status, payload, new_validators = app.fetch_chat_history(url, since, validators)
+        calls.append((since, status, payload))
+        return status, payload, new_validators
+    return fetch
+
+
+def test_list_revalidates_stale_copy(backend, store):
+    url = list_fetch.segment_url(f"{backend.url}/list/", DAY, DAY)
+    items, _ = list_fetch.fetch_list(url, key="segment")
+    assert store.get("list_validators", "segment") is not None
+
+    # ttl=0: the disk copy is stale, so the server is asked with its validators
+    again, _ = list_fetch.fetch_list(url, key="segment", ttl=0)
+    assert backend.not_modified == 1
+    assert [item.id for item in again] == [item.id for item in items]
+    # the 304 made the copy fresh again
+    assert store.get("list", "segment", max_age=60) is not None
+
+
+def test_list_downloads_changed_segment(backend, store):
+    url = list_fetch.segment_url(f"{backend.url}/list/", DAY, DAY)
+    list_fetch.fetch_list(url, key="segment")
+    backend.config.items = 5
+    items, _ = list_fetch.fetch_list(url, key="segment", ttl=0)
+    assert backend.not_modified == 0
+    assert len(items) == 5
+
+
+def test_list_does_not_store_unreadable_reply(store, monkeypatch):
+    calls = []
+
+    def gateway_page(url, **kwargs):
+        calls.append(url)
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b"<html>502 Bad Gateway</html>"
+        return response
+
+    monkeypatch.setattr(http_client, "get", gateway_page)
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.RequestException):
+            list_fetch.fetch_list("http://list/2025-6-2/2025-6-2", key="segment")
+    # nothing cached, every call asks the server again
+    assert len(calls) == 2
+    assert store.get("list", "segment") is None
+
+
+def test_history_merges_new_messages(backend):
+    cache = history_cache.HistoryCache()
+    calls = []
+    fetch = _history_fetch(backend, "1", calls)
+    assert len(cache.sync("1", fetch)) == 4
+
+    backend.history("1").extend([
+        {"role": "user", "content": "q"},
+        {"role": "assistant", "content": "a"},
+    ])
+    cache.expire("1")
+    messages = cache.sync("1", fetch)
+    assert calls[-1][0] == 4
+    assert calls[-1][2] == {"since": 4, "messages": messages[4:]}
+    assert [msg["content"] for msg in messages[4:]] == ["q", "a"]
+
+
+def test_history_not_modified(backend):
+    cache = history_cache.HistoryCache()
+    calls = []
+    fetch = _history_fetch(backend, "1", calls)
+    messages = cache.sync("1", fetch)
+    cache.expire("1")
+    assert cache.sync("1", fetch) == messages
+    assert calls[-1][1] == 304
+    assert backend.not_modified == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_history_full_fetch_when_server_history_changed(backend):
+    cache = history_cache.HistoryCache()
+    calls = []
+    fetch = _history_fetch(backend, "1", calls)
+    cache.sync("1", fetch)
+
+    # the server lost messages: `since` is past its end, it answers with the full list
+    del backend.history("1")[1:]
+    cache.expire("1")
+    assert len(cache.sync("1", fetch)) == 1
+    assert isinstance(calls[-1][2], list)
+
+
+def test_history_refetches_when_increment_does_not_line_up(backend):
+    cache = history_cache.HistoryCache()
+    calls = []
+    fetch = _history_fetch(backend, "1", calls)
+    cache.sync("1", fetch)
+
+    def misaligned(since, validators):
+        if since:
+            calls.append((since, 200, None))
+            return 200, {"since": since - 1, "messages": []}, None
+        return fetch(since, validators)
+
+    cache.expire("1")
+    messages = cache.sync("1", misaligned)
+    assert [call[0] for call in calls[-2:]] == [4, 0]
+    assert messages == [{"role": msg["role"], "content": msg["content"]} for msg in backend.history("1")]
+
+
+def test_recorded_messages_keep_their_place(backend):
+    cache = history_cache.HistoryCache()
+    fetch = _history_fetch(backend, "1", [])
+    cache.sync("1", fetch)
+    cache.record("1", [
+        {"role": "user", "content": "q"},
+        {"role": "assistant", "content": "a", "cached": True},
+    ])
+    backend.history("1").extend([
+        {"role": "user", "content": "live q"},
+        {"role": "assistant", "content": "live a"},
+    ])
+    cache.expire("1")
+    messages = cache.sync("1", fetch)
+    assert [msg["content"] for msg in messages[4:]] == ["q", "a", "live q", "live a"]
+    assert messages[5]["cached"]
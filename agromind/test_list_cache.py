@@ -0,0 +1,52 @@
+"""
+segment planning for list_api ranges
+
+    python -m pytest agromind
+"""
+import datetime
+
+from agromind import list_cache
+
+TODAY = datetime.date(2025, 6, 30)
+
+
+def day(n):
+    return TODAY - datetime.timedelta(days=n)
+
+
+def cached(*segments, ttl=None):
+    cache = list_cache.TTLCache()
+    for segment in segments:
+        cache.set(list_cache.segment_key(segment), [], ttl=ttl)
+    return cache
+
+
+def test_cold_range_is_one_request():
+    assert list_cache.plan_segments(day(30), day(1), cache=cached(), today=TODAY) == [(day(30), day(1))]
+
+
+def test_widening_only_fetches_new_days():
+    cache = cached((day(7), day(1)))
+    assert list_cache.plan_segments(day(30), day(1), cache=cache, today=TODAY) == [
+        (day(30), day(8)),
+        (day(7), day(1)),
+    ]
+
+
+def test_today_and_long_gaps_are_split():
+    segments = list_cache.plan_segments(day(99), TODAY, cache=cached(), today=TODAY)
+    assert segments[-1] == (TODAY, TODAY)
+    assert segments[-2][1] == day(1)
+    assert all((end - start).days < list_cache.MAX_SEGMENT_DAYS for start, end in segments)
+    assert len(segments) == 5
+
+
+def test_segments_outside_the_range_are_not_reused():
+    cache = cached((day(30), day(1)))
+    assert list_cache.plan_segments(day(7), day(1), cache=cache, today=TODAY) == [(day(7), day(1))]
+
+
+def test_fresh_segments_win_over_stale_ones():
+    cache = cached((day(14), day(8)), (day(7), day(1)), ttl=-1)
+    cache.set(list_cache.segment_key((day(14), day(1))), [])
+    assert list_cache.plan_segments(day(14), day(1), cache=cache, today=TODAY) == [(day(14), day(1))]
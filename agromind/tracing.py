@@ -0,0 +1,228 @@
+"""
+lightweight per-rerun timing spans
+
+A trace covers one script run (or fragment run); spans inside it record wall
+time, payload bytes and cache status for the phases we care about (list_api,
+get_chat_history, llm_api, parsing, rendering). Finished traces are kept in
+memory for the debug panel and appended to a rotating JSONL file.
+
+Spans opened on a thread without an active trace (worker pools) are written
+as standalone one-span traces.
+"""
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+DEFAULT_PATH = os.environ.get(
+    "AGROMIND_TRACE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "trace.jsonl"),
+)
+MAX_FILE_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 3
+# finished traces kept in memory for the debug panel
+RECENT_TRACES = 200
+
+_local = threading.local()
+_recent = deque(maxlen=RECENT_TRACES)
+_recent_lock = threading.Lock()
+_writer = None
+_writer_lock = threading.Lock()
+
+
+class Span:
+    __slots__ = ("name", "start", "duration", "attrs")
+
+    def __init__(self, name, start, attrs):
+        self.name = name
+        self.start = start
+        self.duration = None
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add_bytes(self, nbytes):
+        self.attrs["bytes"] = self.attrs.get("bytes", 0) + nbytes
+
+
+class Trace:
+    __slots__ = ("name", "started_at", "start", "duration", "spans", "attrs")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.spans = []
+        self.attrs = attrs
+
+    def to_dict(self):
+        return {
+            "trace": self.name,
+            "ts": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3),
+            **self.attrs,
+            "spans": [
+                {
+                    "name": span.name,
+                    "start_ms": round((span.start - self.start) * 1000, 3),
+                    "duration_ms": round((span.duration or 0) * 1000, 3),
+                    **span.attrs,
+                }
+                for span in self.spans
+            ],
+        }
+
+
+def _stack():
+    stack = getattr(_local, "spans", None)
+    if stack is None:
+        stack = _local.spans = []
+    return stack
+
+
+def current_trace():
+    return getattr(_local, "trace", None)
+
+
+def begin(name, **attrs):
+    """
+    start the trace for this thread's script run, replacing an unfinished one
+    """
+    _local.trace = Trace(name, attrs)
+    _local.spans = []
+    return _local.trace
+
+
+def end():
+    """
+    finish this thread's trace: keep it for the debug panel and write it out
+    """
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        return None
+    _local.trace = None
+    trace.duration = time.perf_counter() - trace.start
+    _publish(trace)
+    return trace
+
+
+@contextmanager
+def trace(name, **attrs):
+    """
+    trace a fragment run; inside an active trace this is just a span
+    """
+    if current_trace() is not None:
+        with span(name, **attrs) as s:
+            yield s
+        return
+    begin(name, **attrs)
+    try:
+        yield None
+    finally:
+        end()
+
+
+def traced(name):
+    """
+    decorator: run the function inside trace(name), for st.fragment bodies
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with trace(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def span(name, **attrs):
+    s = Span(name, time.perf_counter(), attrs)
+    stack = _stack()
+    stack.append(s)
+    try:
+        yield s
+    finally:
+        stack.pop()
+        s.duration = time.perf_counter() - s.start
+        active = current_trace()
+        if active is not None:
+            active.spans.append(s)
+        else:
+            _publish_standalone(s)
+
+
+def annotate(**attrs):
+    """
+    set attributes on the innermost open span of this thread, if any
+    """
+    stack = _stack()
+    if stack:
+        stack[-1].set(**attrs)
+
+
+def add_bytes(nbytes):
+    stack = _stack()
+    if stack:
+        stack[-1].add_bytes(nbytes)
+
+
+def record(name, duration, **attrs):
+    """
+    publish an already-measured span as a standalone trace
+    """
+    s = Span(name, time.perf_counter() - duration, attrs)
+    s.duration = duration
+    _publish_standalone(s)
+
+
+def recent(limit=None):
+    with _recent_lock:
+        traces = list(_recent)
+    return traces[-limit:] if limit else traces
+
+
+def _publish_standalone(s):
+    t = Trace(s.name, {})
+    t.start = s.start
+    t.started_at = time.time() - s.duration
+    t.duration = s.duration
+    t.spans.append(s)
+    _publish(t)
+
+
+def _publish(trace):
+    data = trace.to_dict()
+    with _recent_lock:
+        _recent.append(data)
+    writer = _get_writer()
+    if writer is not None:
+        writer.info(json.dumps(data, ensure_ascii=False, default=str))
+
+
+def _get_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                writer = logging.getLogger("agromind.trace")
+                writer.propagate = False
+                writer.setLevel(logging.INFO)
+                try:
+                    os.makedirs(os.path.dirname(DEFAULT_PATH) or ".", exist_ok=True)
+                    handler = logging.handlers.RotatingFileHandler(
+                        DEFAULT_PATH, maxBytes=MAX_FILE_BYTES, backupCount=BACKUP_COUNT, encoding="utf-8"
+                    )
+                except OSError:
+                    handler = logging.NullHandler()
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                writer.addHandler(handler)
+                _writer = writer
+    return _writer
@@ -0,0 +1,59 @@
+"""
+bounded chat transcript for the question screen
+
+Only the most recent messages are kept in session state and drawn as chat
+bubbles. Older ones stay in the process-wide history cache; the question
+screen shows them collapsed and draws them on demand, a page at a time, as a
+single markdown block built from per-message snippets that are cached.
+"""
+import functools
+from collections import deque
+
+# messages kept in session state and drawn as chat bubbles
+RECENT_MESSAGES = 40
+# older messages revealed per "show earlier" click
+OLDER_PAGE = 40
+
+ROLE_LABELS = {"user": "提问", "assistant": "Agromind"}
+
+
+class Transcript:
+    """
+    ring buffer of recent messages plus a count of the older ones it dropped
+    """
+    __slots__ = ("recent", "older")
+
+    def __init__(self, messages=(), limit=RECENT_MESSAGES):
+        messages = list(messages)
+        self.recent = deque(messages[-limit:] if limit else (), maxlen=limit)
+        self.older = len(messages) - len(self.recent)
+
+    def __iter__(self):
+        return iter(self.recent)
+
+    def __len__(self):
+        return len(self.recent)
+
+    def __getitem__(self, index):
+        return self.recent[index]
+
+    def append(self, message):
+        if len(self.recent) == self.recent.maxlen:
+            self.older += 1
+        self.recent.append(message)
+
+
+@functools.lru_cache(maxsize=4096)
+def message_markdown(role, content):
+    label = ROLE_LABELS.get(role, role)
+    return f"**{label}**\n\n{content}"
+
+
+def older_markdown(history, older, shown):
+    """
+    markdown for the `shown` newest of the first `older` messages of history
+    """
+    start = max(older - shown, 0)
+    return "\n\n---\n\n".join(
+        message_markdown(message["role"], message["content"]) for message in history[start:older]
+    )
@@ -0,0 +1,210 @@
+"""
+headless rerun benchmarks, driven by streamlit.testing AppTest against the
+local mock backend
+
+    python benchmarks/bench_app.py
+    python benchmarks/bench_app.py --cards 10 100 --history 100 --json after.json --compare before.json
+
+The report goes to stdout; Streamlit's own warnings go to stderr (2>/dev/null).
+
+Measures, per scenario:
+    cold_ms     first script run with empty caches (fetch + parse + render)
+    ttfc_ms     time to first card: list_api done plus one card's share of rendering
+    rerun_ms    median of warm reruns
+    peak_mb     peak traced Python memory over a cold and a warm run
+"""
+import argparse
+import datetime
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TMP = tempfile.mkdtemp(prefix="agromind-bench-")
+# keep benchmark caches and traces away from the app's own .cache directory
+os.environ.setdefault("AGROMIND_CACHE_PATH", os.path.join(_TMP, "cache.sqlite3"))
+os.environ.setdefault("AGROMIND_TRACE_PATH", os.path.join(_TMP, "trace.jsonl"))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from agromind import aggregates  # noqa: E402
+from agromind import answer_cache  # noqa: E402
+from agromind import chart_data  # noqa: E402
+from agromind import disk_cache  # noqa: E402
+from agromind import history_cache  # noqa: E402
+from agromind import list_cache  # noqa: E402
+import mock_backend  # noqa: E402
+from agromind import tracing  # noqa: E402
+from agromind import transcript  # noqa: E402
+
+BENCH_DAY = datetime.date.today() - datetime.timedelta(days=1)
+WARM_RERUNS = 5
+
+
+def reset_caches():
+    # every process-wide cache, item ids repeat across scenarios
+    list_cache.list_results.clear()
+    chart_data._series_cache.clear()
+    chart_data._page_cache.clear()
+    aggregates._index_cache.clear()
+    answer_cache.answers.clear()
+    transcript.message_markdown.cache_clear()
+    history_cache.histories.clear()
+    disk_cache.store = disk_cache.DiskCache(os.path.join(_TMP, f"cache-{uuid.uuid4().hex}.sqlite3"))
+    history_cache.histories.store = disk_cache.store
+
+
+def make_app(backend_url):
+    at = AppTest.from_file(os.path.join(ROOT, "main.py"), default_timeout=600)
+    at.secrets["LIST_API_URL"] = f"{backend_url}/list/"
+    at.secrets["NEW_NEW_LLM_API_URL"] = backend_url
+    at.secrets["USER_AVATAR"] = os.path.join(ROOT, "asset", "user_avatar.png")
+    at.secrets["ASSISTANT_AVATAR"] = os.path.join(ROOT, "asset", "assistant_avatar.png")
+    # a single historic day, so the mock returns exactly `items` cards
+    at.session_state["selected_start_date"] = BENCH_DAY
+    at.session_state["selected_end_date"] = BENCH_DAY
+    return at
+
+
+def timed_run(at, action=None):
+    start = time.perf_counter()
+    (action or at.run)()
+    elapsed = (time.perf_counter() - start) * 1000
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return elapsed
+
+
+def last_rerun_trace():
+    for trace in reversed(tracing.recent()):
+        if trace["trace"] == "rerun":
+            return trace
+    return None
+
+
+def time_to_first_card(trace):
+    spans = {span["name"]: span for span in trace["spans"]}
+    list_span, render_span = spans.get("list_api"), spans.get("render_list_item")
+    if list_span is None or render_span is None or not render_span.get("cards"):
+        return None
+    return (list_span["start_ms"] + list_span["duration_ms"]
+            + render_span["duration_ms"] / render_span["cards"])
+
+
+def peak_memory(run):
+    reset_caches()
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def bench_cards(cards, points):
+    backend = mock_backend.MockBackend(mock_backend.MockConfig(items=cards, points=points))
+    url = backend.start()
+    try:
+        reset_caches()
+        at = make_app(url)
+        cold = timed_run(at)
+        ttfc = time_to_first_card(last_rerun_trace())
+        reruns = [timed_run(at) for _ in range(WARM_RERUNS)]
+
+        def cold_and_warm():
+            app = make_app(url)
+            app.run()
+            app.run()
+
+        return {
+            "scenario": f"cards={cards}",
+            "cold_ms": cold,
+            "ttfc_ms": ttfc,
+            "rerun_ms": statistics.median(reruns),
+            "peak_mb": peak_memory(cold_and_warm),
+        }
+    finally:
+        backend.stop()
+
+
+def bench_history(messages, cards=1):
+    backend = mock_backend.MockBackend(mock_backend.MockConfig(items=cards, history=messages))
+    url = backend.start()
+    item_id = f"{BENCH_DAY.isoformat()}-0"
+    try:
+        reset_caches()
+        at = make_app(url)
+        at.run()
+        cold = timed_run(at, lambda: at.button(key=item_id).click().run())
+        reruns = [timed_run(at) for _ in range(WARM_RERUNS)]
+
+        def open_chat():
+            app = make_app(url)
+            app.run()
+            app.button(key=item_id).click().run()
+            app.run()
+
+        return {
+            "scenario": f"history={messages}",
+            "cold_ms": cold,
+            "ttfc_ms": None,
+            "rerun_ms": statistics.median(reruns),
+            "peak_mb": peak_memory(open_chat),
+        }
+    finally:
+        backend.stop()
+
+
+def _fmt(value, unit=""):
+    return "-" if value is None else f"{value:,.1f}{unit}"
+
+
+def report(results, baseline=None):
+    baseline = {row["scenario"]: row for row in baseline or []}
+    columns = ("cold_ms", "ttfc_ms", "rerun_ms", "peak_mb")
+    print(f"{'scenario':<16}" + "".join(f"{name:>22}" for name in columns))
+    for row in results:
+        line = f"{row['scenario']:<16}"
+        before = baseline.get(row["scenario"], {})
+        for name in columns:
+            cell = _fmt(row[name])
+            if before.get(name) and row[name] is not None:
+                cell += f" ({(row[name] / before[name] - 1) * 100:+.0f}%)"
+            line += f"{cell:>22}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AppTest rerun benchmarks against the mock backend")
+    parser.add_argument("--cards", type=int, nargs="*", default=[10, 100, 1000])
+    parser.add_argument("--points", type=int, default=30, help="points per chart series")
+    parser.add_argument("--history", type=int, nargs="*", default=[20, 500, 5000])
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="earlier --json output to diff against")
+    args = parser.parse_args()
+    # Streamlit reads .streamlit/config.toml (static serving) from the working
+    # directory, like `streamlit run`
+    os.chdir(ROOT)
+
+    results = [bench_cards(cards, args.points) for cards in args.cards]
+    results += [bench_history(messages) for messages in args.history]
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    report(results, baseline)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"date": datetime.datetime.now().isoformat(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
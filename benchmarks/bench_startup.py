@@ -0,0 +1,130 @@
+"""
+cold start and per-rerun script overhead, each sample in a fresh interpreter
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --samples 10 --cards 1 --json after.json --compare before.json
+
+Streamlit's own warnings go to stderr (2>/dev/null).
+
+Every sample is a new Python process that has imported Streamlit but none of
+the app's modules, so the first script run pays for importing them, building
+the page and drawing `--cards` cards (few by default, to keep rendering out
+of the number):
+
+    cold_ms      first script run in a fresh process
+    rerun_ms     median of warm reruns of the same page
+    compact_ms   median of warm reruns with the compact view (one chart element)
+    question_ms  median of warm reruns of the question screen
+    payload_kb   serialized size of all elements sent for one main-screen rerun
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WARM_RERUNS = 10
+
+
+def _element_bytes(node):
+    children = getattr(node, "children", None)
+    if isinstance(children, dict):
+        return sum(_element_bytes(child) for child in children.values())
+    proto = getattr(node, "proto", None)
+    return len(proto.SerializeToString()) if proto is not None else 0
+
+
+def _median_run(at, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        at.run()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def child(cards):
+    tmp = tempfile.mkdtemp(prefix="agromind-startup-")
+    os.environ["AGROMIND_CACHE_PATH"] = os.path.join(tmp, "cache.sqlite3")
+    os.environ["AGROMIND_TRACE_PATH"] = os.path.join(tmp, "trace.jsonl")
+    sys.path.insert(0, ROOT)
+    # Streamlit reads .streamlit/config.toml (static serving) from the working
+    # directory, like `streamlit run`
+    os.chdir(ROOT)
+
+    from streamlit.testing.v1 import AppTest
+
+    import mock_backend
+
+    backend = mock_backend.MockBackend(mock_backend.MockConfig(items=cards, points=30, history=20))
+    url = backend.start()
+    at = AppTest.from_file(os.path.join(ROOT, "main.py"), default_timeout=600)
+    at.secrets["LIST_API_URL"] = f"{url}/list/"
+    at.secrets["NEW_NEW_LLM_API_URL"] = url
+    at.secrets["USER_AVATAR"] = os.path.join(ROOT, "asset", "user_avatar.png")
+    at.secrets["ASSISTANT_AVATAR"] = os.path.join(ROOT, "asset", "assistant_avatar.png")
+
+    start = time.perf_counter()
+    at.run()
+    cold = (time.perf_counter() - start) * 1000
+    rerun = _median_run(at, WARM_RERUNS)
+    payload = _element_bytes(at._tree) / 1024
+    at.toggle(key="compact_view_toggle").set_value(True).run()
+    compact = _median_run(at, WARM_RERUNS)
+
+    item_id = next(button.key for button in at.button if button.label == "向Agromind提问")
+    at.button(key=item_id).click().run()
+    question = _median_run(at, WARM_RERUNS)
+    backend.stop()
+    print(json.dumps({
+        "cold_ms": cold,
+        "rerun_ms": rerun,
+        "compact_ms": compact,
+        "question_ms": question,
+        "payload_kb": payload,
+    }))
+
+
+def sample(cards):
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", "--cards", str(cards)],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="cold start and rerun overhead benchmark")
+    parser.add_argument("--samples", type=int, default=5, help="fresh processes to measure")
+    parser.add_argument("--cards", type=int, default=1, help="cards per day on the dashboard")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="earlier --json output to diff against")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args.cards)
+
+    samples = [sample(args.cards) for _ in range(args.samples)]
+    results = {name: statistics.median(s[name] for s in samples) for name in samples[0]}
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    print(f"== startup, {args.samples} fresh processes, {args.cards} cards/day ==")
+    for name, value in results.items():
+        line = f"{name:<13}{value:>10.1f}"
+        if baseline and baseline.get(name):
+            line += f"   was {baseline[name]:>8.1f}  ({(value - baseline[name]) / baseline[name]:+.0%})"
+        print(line)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
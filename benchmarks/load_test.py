@@ -0,0 +1,264 @@
+"""
+multi-session load test: N simulated agronomists in one Streamlit process
+
+Every session is an AppTest instance on its own thread, all sharing this
+process's caches and worker pools just like sessions of one `streamlit run`.
+Each session loops over a realistic flow against the local mock backend:
+
+    open dashboard -> change date range -> load more -> open an item
+    -> ask a question (wait for the streamed answer) -> back
+
+    python benchmarks/load_test.py --sessions 20 --duration 60
+    python benchmarks/load_test.py --sessions 5 10 20 40 --duration 30 --latency 0.05
+
+Reports p50/p95/p99 latency per interaction, interactions per second,
+resident memory per session, and samples the growth of each session's
+st.session_state (messages, visible cards) over time.
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TMP = tempfile.mkdtemp(prefix="agromind-load-")
+# keep load-test caches and traces away from the app's own .cache directory
+os.environ.setdefault("AGROMIND_CACHE_PATH", os.path.join(_TMP, "cache.sqlite3"))
+os.environ.setdefault("AGROMIND_TRACE_PATH", os.path.join(_TMP, "trace.jsonl"))
+sys.path.insert(0, ROOT)
+
+import streamlit as st  # noqa: E402
+from streamlit.runtime.secrets import Secrets  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import mock_backend  # noqa: E402
+
+QUESTIONS = ("灌溉量是否正常?", "尾水比例偏高的原因?", "明天需要增加灌溉吗?", "最近一周的趋势如何?")
+# seconds between polls while waiting for a streamed answer
+ANSWER_POLL = 0.1
+
+
+def rss_bytes():
+    """
+    resident set size of this process
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        # ru_maxrss is a peak, in KiB on Linux; good enough where /proc is missing
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def install_secrets(backend_url):
+    """
+    AppTest swaps st.secrets around every run when it is given secrets, which
+    races between threads; install them once, process-wide, the same way
+    """
+    secrets = Secrets()
+    secrets._secrets = {
+        "LIST_API_URL": f"{backend_url}/list/",
+        "NEW_NEW_LLM_API_URL": backend_url,
+        "USER_AVATAR": os.path.join(ROOT, "asset", "user_avatar.png"),
+        "ASSISTANT_AVATAR": os.path.join(ROOT, "asset", "assistant_avatar.png"),
+    }
+    st.secrets = secrets
+
+
+class Recorder:
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = 0
+        # interactions the end of the run interrupted, not timed
+        self.unfinished = 0
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.latencies.setdefault(name, []).append(seconds * 1000)
+
+    def error(self):
+        with self._lock:
+            self.errors += 1
+
+    def interrupted(self):
+        with self._lock:
+            self.unfinished += 1
+
+    def count(self):
+        with self._lock:
+            return sum(len(values) for values in self.latencies.values())
+
+
+class Session:
+
+    def __init__(self, index, recorder, stop, max_days):
+        self.index = index
+        self.recorder = recorder
+        self.stop = stop
+        self.max_days = max_days
+        self.random = random.Random(index)
+        self.app = AppTest.from_file(os.path.join(ROOT, "main.py"), default_timeout=300)
+
+    def _step(self, name, action):
+        start = time.perf_counter()
+        finished = action()
+        if self.app.exception:
+            self.recorder.error()
+            return False
+        if finished is False:
+            # the run ended mid-interaction, its time would be too short
+            self.recorder.interrupted()
+            return False
+        self.recorder.add(name, time.perf_counter() - start)
+        return True
+
+    def state(self):
+        """
+        (messages, approx message bytes, visible cards) of this session
+        """
+        state = self.app.session_state
+        try:
+            messages = state["messages"]
+            visible = state["visible_cards"]
+        except KeyError:
+            return 0, 0, 0
+        return len(messages), sum(len(m["content"].encode("utf-8")) for m in messages), visible
+
+    def _ask(self):
+        """
+        ask a question and wait for the answer; False when the run stopped first
+        """
+        app = self.app
+        app.chat_input[0].set_value(self.random.choice(QUESTIONS)).run()
+        # the answer streams in on a worker, the page polls it
+        while app.session_state["llm_job"] is not None and not self.stop.is_set():
+            time.sleep(ANSWER_POLL)
+            app.run()
+        return app.session_state["llm_job"] is None
+
+    def run(self):
+        app = self.app
+        if not self._step("open_dashboard", app.run):
+            return
+        while not self.stop.is_set():
+            today = datetime.date.today()
+            start = today - datetime.timedelta(days=self.random.randint(1, self.max_days))
+            ok = self._step("change_range", lambda: app.date_input[0].set_value((start, today)).run())
+            if ok and any(button.key == "load_more_cards" for button in app.button):
+                ok = self._step("load_more", lambda: app.button(key="load_more_cards").click().run())
+            cards = [button.key for button in app.button if button.label == "向Agromind提问"]
+            if not ok or not cards:
+                continue
+            item_id = self.random.choice(cards)
+            if not self._step("open_item", lambda: app.button(key=item_id).click().run()):
+                continue
+            if not self._step("ask", self._ask):
+                continue
+            self._step("back", lambda: app.button(key="header_back_button").click().run())
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return None
+    k = (len(values) - 1) * q
+    lower = int(k)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (k - lower)
+
+
+def run_load(sessions, duration, config, max_days, sample_every):
+    backend = mock_backend.MockBackend(config)
+    url = backend.start()
+    install_secrets(url)
+    recorder = Recorder()
+    stop = threading.Event()
+    baseline_rss = rss_bytes()
+
+    users = [Session(i, recorder, stop, max_days) for i in range(sessions)]
+    threads = [threading.Thread(target=user.run, name=f"session-{i}", daemon=True) for i, user in enumerate(users)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    peak_rss = baseline_rss
+    while time.perf_counter() - started < duration:
+        time.sleep(sample_every)
+        rss = rss_bytes()
+        peak_rss = max(peak_rss, rss)
+        states = [user.state() for user in users]
+        recorder.samples.append({
+            "t": time.perf_counter() - started,
+            "rss_mb": rss / (1024 * 1024),
+            "messages": sum(s[0] for s in states) / sessions,
+            "message_kb": sum(s[1] for s in states) / sessions / 1024,
+            "visible_cards": sum(s[2] for s in states) / sessions,
+            "interactions": recorder.count(),
+        })
+
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=60)
+    elapsed = time.perf_counter() - started
+    backend.stop()
+    return recorder, elapsed, baseline_rss, peak_rss, backend
+
+
+def report(sessions, recorder, elapsed, baseline_rss, peak_rss, backend):
+    print(f"\n== {sessions} sessions, {elapsed:.0f}s, "
+          f"{backend.requests} upstream requests, {backend.bytes_sent / (1024 * 1024):.1f} MB sent ==")
+    print(f"{'interaction':<16}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for name, values in recorder.latencies.items():
+        print(f"{name:<16}{len(values):>8}"
+              f"{percentile(values, 0.50):>10.0f}{percentile(values, 0.95):>10.0f}"
+              f"{percentile(values, 0.99):>10.0f}{statistics.mean(values):>10.0f}")
+    total = recorder.count()
+    print(f"throughput      {total / elapsed:.2f} interactions/s, {recorder.errors} errors, "
+          f"{recorder.unfinished} cut short by the end of the run")
+    print(f"memory          rss peak {peak_rss / (1024 * 1024):.0f} MB, "
+          f"{(peak_rss - baseline_rss) / sessions / (1024 * 1024):.1f} MB per session over baseline")
+
+    print(f"{'t s':>6}{'rss MB':>9}{'msgs/sess':>11}{'msg KB/sess':>13}{'cards/sess':>12}{'done':>7}")
+    for sample in recorder.samples:
+        print(f"{sample['t']:>6.0f}{sample['rss_mb']:>9.0f}{sample['messages']:>11.1f}"
+              f"{sample['message_kb']:>13.1f}{sample['visible_cards']:>12.1f}{sample['interactions']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="concurrent session load test against the mock backend")
+    parser.add_argument("--sessions", type=int, nargs="*", default=[10])
+    parser.add_argument("--duration", type=float, default=60, help="seconds per run")
+    parser.add_argument("--items", type=int, default=5, help="cards per day")
+    parser.add_argument("--points", type=int, default=30, help="points per chart series")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every upstream request")
+    parser.add_argument("--history", type=int, default=20, help="preloaded messages per item")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds between streamed chunks")
+    parser.add_argument("--max-days", type=int, default=30, help="widest date range a session picks")
+    parser.add_argument("--sample-every", type=float, default=5, help="seconds between state samples")
+    args = parser.parse_args()
+    # Streamlit reads .streamlit/config.toml (static serving) from the working
+    # directory, like `streamlit run`
+    os.chdir(ROOT)
+
+    for sessions in args.sessions:
+        config = mock_backend.MockConfig(
+            items=args.items,
+            points=args.points,
+            latency=args.latency,
+            history=args.history,
+            token_delay=args.token_delay,
+        )
+        report(sessions, *run_load(sessions, args.duration, config, args.max_days, args.sample_every))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+headless irrigation report export
+
+Pulls a date range from the list API with the app's own fetching and parsing
+(list_fetch), a bounded number of segments at a time, and streams one row per
+card (or per card and week / month) to CSV, Parquet or HTML as segments
+arrive, so a season of data never has to fit in memory:
+
+    python export_report.py --start 2025-03-01 --end 2025-08-31 -o season.csv
+    python export_report.py --start 2025-06-02 --end 2025-06-08 --rollup week -o week.html
+    python export_report.py --start 2025-01-01 --end 2025-12-31 --rollup month -o year.parquet
+
+The list API URL comes from --list-url, the LIST_API_URL environment variable
+or LIST_API_URL in .streamlit/secrets.toml. Responses go through the same
+disk cache as the dashboard, so a rerun only downloads what changed.
+"""
+import argparse
+import csv
+import datetime
+import html
+import logging
+import math
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from agromind import aggregates
+from agromind import list_cache
+from agromind import list_fetch
+
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+SECRETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".streamlit", "secrets.toml")
+# segments fetched at once
+DEFAULT_WORKERS = 8
+ROLLUP_UNITS = {"week": "W", "month": "M"}
+
+COLUMNS = (
+    "id", "title", "range", "period",
+    "irrigation_total", "irrigation_mean", "tail_total", "tail_mean", "tail_ratio",
+)
+
+
+def list_api_url(value=None):
+    if value:
+        return value
+    if os.environ.get("LIST_API_URL"):
+        return os.environ["LIST_API_URL"]
+    if tomllib is not None and os.path.exists(SECRETS_PATH):
+        with open(SECRETS_PATH, "rb") as f:
+            return tomllib.load(f).get("LIST_API_URL")
+    return None
+
+
+def iter_segments(base_url, segments, workers=DEFAULT_WORKERS, errors=None):
+    """
+    yield the parsed items of each segment in order, with at most `workers`
+    requests in flight and at most 2 * workers segments held in memory
+    """
+    segments = iter(segments)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export") as pool:
+        pending = deque()
+
+        def submit():
+            segment = next(segments, None)
+            if segment is not None:
+                pending.append((segment, pool.submit(list_fetch.fetch_segment, base_url, *segment)))
+
+        for _ in range(workers * 2):
+            submit()
+        while pending:
+            segment, future = pending.popleft()
+            submit()
+            try:
+                items, _ = future.result()
+            except requests.exceptions.RequestException as e:
+                logger.warning("segment %s ~ %s failed: %s", segment[0], segment[1], e)
+                if errors is not None:
+                    errors.append(segment)
+                continue
+            yield items
+
+
+def _ratio(tail, irrigation):
+    return tail / irrigation if irrigation and tail is not None else None
+
+
+def _row(item, period, figures):
+    return {
+        "id": item.id,
+        "title": item.title,
+        "range": item.date_range,
+        "period": period,
+        "irrigation_total": figures.get("irrigation_total"),
+        "irrigation_mean": figures.get("irrigation_mean"),
+        "tail_total": figures.get("tail_total"),
+        "tail_mean": figures.get("tail_mean"),
+        "tail_ratio": figures.get("tail_ratio"),
+    }
+
+
+def item_rows(item, start, end, rollup=None):
+    """
+    report rows for one card over [start, end], from the aggregates index
+    """
+    if rollup is None:
+        return [_row(item, f"{start} ~ {end}", aggregates.summary(item, start, end))]
+
+    periods = {}
+    for name, index in aggregates.item_index(item).items():
+        days, totals, means = index.between(start, end).rollup(rollup)
+        for day, total, mean in zip(days.astype(str), totals.tolist(), means.tolist()):
+            figures = periods.setdefault(day[:7] if rollup == "M" else day, {})
+            figures[f"{name}_total"] = total
+            figures[f"{name}_mean"] = None if math.isnan(mean) else mean
+    rows = []
+    for period in sorted(periods):
+        figures = periods[period]
+        figures["tail_ratio"] = _ratio(figures.get("tail_total"), figures.get("irrigation_total"))
+        rows.append(_row(item, period, figures))
+    return rows
+
+
+class CsvWriter:
+
+    def __init__(self, path):
+        # utf-8-sig so spreadsheet apps pick up the Chinese titles
+        self._file = open(path, "w", newline="", encoding="utf-8-sig")
+        self._writer = csv.DictWriter(self._file, fieldnames=COLUMNS)
+        self._writer.writeheader()
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+
+    def __init__(self, path):
+        if pyarrow is None:
+            raise SystemExit("Parquet export needs pyarrow: pip install pyarrow")
+        self._schema = pyarrow.schema(
+            [(name, pyarrow.string()) for name in COLUMNS[:4]]
+            + [(name, pyarrow.float64()) for name in COLUMNS[4:]]
+        )
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+
+    def write(self, rows):
+        if rows:
+            self._writer.write_table(pyarrow.Table.from_pylist(rows, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+class HtmlWriter:
+
+    def __init__(self, path, title):
+        self._file = open(path, "w", encoding="utf-8")
+        self._file.write(
+            "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+            f"<title>{html.escape(title)}</title>"
+            "<style>body{font-family:sans-serif}table{border-collapse:collapse}"
+            "td,th{border:1px solid #ddd;padding:4px 8px}td.n{text-align:right}</style>"
+            f"</head><body><h3>{html.escape(title)}</h3>\n<table>\n<tr>"
+            + "".join(f"<th>{name}</th>" for name in COLUMNS) + "</tr>\n"
+        )
+
+    def write(self, rows):
+        for row in rows:
+            cells = []
+            for name in COLUMNS:
+                value = row[name]
+                if isinstance(value, float):
+                    cells.append(f"<td class=\"n\">{value:.4g}</td>")
+                else:
+                    cells.append(f"<td>{html.escape('' if value is None else str(value))}</td>")
+            self._file.write("<tr>" + "".join(cells) + "</tr>\n")
+
+    def close(self):
+        self._file.write("</table>\n</body></html>\n")
+        self._file.close()
+
+
+def open_writer(path, fmt, title):
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt == "csv":
+        return CsvWriter(path)
+    if fmt == "parquet":
+        return ParquetWriter(path)
+    if fmt in ("html", "htm"):
+        return HtmlWriter(path, title)
+    raise SystemExit(f"unknown output format: {fmt!r} (csv, parquet or html)")
+
+
+def export(base_url, start, end, writer, rollup=None, workers=DEFAULT_WORKERS, errors=None):
+    """
+    stream report rows for every card between start and end into writer;
+    returns (cards, rows)
+    """
+    seen = set()
+    cards = rows = 0
+    for items in iter_segments(base_url, list_cache.segment_range(start, end), workers, errors):
+        batch = []
+        for item in items:
+            # a card can show up in several segments
+            if item.id in seen:
+                continue
+            seen.add(item.id)
+            cards += 1
+            batch.extend(item_rows(item, start, end, rollup))
+        writer.write(batch)
+        rows += len(batch)
+    return cards, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="export irrigation reports from the list API")
+    parser.add_argument("--start", required=True, type=datetime.date.fromisoformat, help="YYYY-MM-DD")
+    parser.add_argument("--end", required=True, type=datetime.date.fromisoformat, help="YYYY-MM-DD")
+    parser.add_argument("-o", "--output", required=True, help="output file (.csv, .parquet or .html)")
+    parser.add_argument("--format", choices=("csv", "parquet", "html"), help="defaults to the output extension")
+    parser.add_argument("--rollup", choices=tuple(ROLLUP_UNITS), help="one row per card and week / month")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="segments fetched at once")
+    parser.add_argument("--list-url", help="list API base URL, like LIST_API_URL")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    base_url = list_api_url(args.list_url)
+    if not base_url:
+        raise SystemExit("no list API URL: pass --list-url or set LIST_API_URL")
+    if args.end < args.start:
+        raise SystemExit("--end is before --start")
+
+    started = time.perf_counter()
+    errors = []
+    writer = open_writer(args.output, args.format, f"灌溉报告 {args.start} ~ {args.end}")
+    try:
+        cards, rows = export(base_url, args.start, args.end, writer,
+                             ROLLUP_UNITS.get(args.rollup), args.workers, errors)
+    finally:
+        writer.close()
+    logger.info("%d rows for %d cards written to %s in %.1fs",
+                rows, cards, args.output, time.perf_counter() - started)
+    if errors:
+        logger.warning("%d segments failed and are missing from the report", len(errors))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
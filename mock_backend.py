@@ -0,0 +1,254 @@
+"""
+local stand-in for the farm backend, for benchmarks and load tests
+
+Implements the two endpoints the app talks to:
+
+    GET  {LIST_API_URL}{start}/{end}   list of cards, `items` per day (ETag /
+                                        Last-Modified, 304 when unchanged)
+    POST /{item_id}/chat                {"prompt": ""} -> history,
+                                        {"prompt": "..."} -> answer (SSE when "stream")
+
+Latency, payload size (points per chart series), items per day and the
+length of preloaded chat histories are configurable:
+
+    python mock_backend.py --port 8600 --items 20 --points 30 --latency 0.05
+
+then point .streamlit/secrets.toml at it:
+
+    LIST_API_URL = "http://127.0.0.1:8600/list/"
+    NEW_NEW_LLM_API_URL = "http://127.0.0.1:8600"
+"""
+import argparse
+import datetime
+import email.utils
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockConfig:
+
+    def __init__(self, items=10, points=7, latency=0.0, history=0, token_delay=0.0, answer_words=40,
+                 react=False):
+        self.items = items
+        self.points = points
+        self.latency = latency
+        self.history = history
+        self.token_delay = token_delay
+        self.answer_words = answer_words
+        # answer like an agent: "Thought: ...\nFinal Answer: ..."
+        self.react = react
+
+
+def _parse_day(value):
+    year, month, day = (int(part) for part in value.split("-"))
+    return datetime.date(year, month, day)
+
+
+def make_item(day, index, points):
+    """
+    one card for `day`, with `points` daily values per series ending on that day
+    """
+    times = [(day - datetime.timedelta(days=points - 1 - i)).isoformat() for i in range(points)]
+    data = {
+        "irrigation": [{"time": t, "value": round(20 + (index * 7 + i * 3) % 15 + 0.5, 1)}
+                       for i, t in enumerate(times)],
+        "tail": [{"time": t, "value": round(5 + (index * 5 + i * 2) % 9 + 0.25, 2)}
+                 for i, t in enumerate(times)],
+    }
+    return {
+        "id": f"{day.isoformat()}-{index}",
+        "range": f"{times[0]} ~ {times[-1]}",
+        "title": f"{index + 1}号大棚灌溉日报",
+        "content": f"{day.isoformat()} 灌溉与尾水情况汇总。",
+        "data": json.dumps(data, ensure_ascii=False),
+    }
+
+
+class MockBackend:
+    """
+    threaded HTTP server; start() returns the base URL
+    """
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or MockConfig()
+        self.histories = {}
+        self.requests = 0
+        self.bytes_sent = 0
+        self.not_modified = 0
+        # generated cards never change, so they were all last modified at start-up
+        self.last_modified = email.utils.formatdate(usegmt=True)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def history(self, item_id):
+        with self._lock:
+            if item_id not in self.histories:
+                self.histories[item_id] = [
+                    {"role": "user" if i % 2 == 0 else "assistant",
+                     "content": f"第{i // 2 + 1}个问题" if i % 2 == 0 else "灌溉量正常，尾水比例在合理范围内。" * 3}
+                    for i in range(self.config.history)
+                ]
+            return self.histories[item_id]
+
+    def answer(self, prompt):
+        words = ["灌溉量正常。"] * self.config.answer_words
+        answer = f"关于“{prompt}”：" + "".join(words)
+        if self.config.react:
+            thought = "Thought: 需要查看最近的灌溉与尾水数据。\nAction: query_data\nObservation: 数据正常。\n"
+            return thought * 3 + "Thought: 可以回答了。\nFinal Answer: " + answer
+        return answer
+
+    def _handler_class(self):
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body=b"", content_type="application/json", headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                with backend._lock:
+                    backend.bytes_sent += len(body)
+
+            def _json(self, payload, headers=None):
+                self._send(200, json.dumps(payload, ensure_ascii=False).encode("utf-8"), headers=headers)
+
+            def _delay(self):
+                with backend._lock:
+                    backend.requests += 1
+                if backend.config.latency:
+                    time.sleep(backend.config.latency)
+
+            def do_GET(self):
+                self._delay()
+                parts = self.path.strip("/").split("/")
+                try:
+                    start, end = _parse_day(parts[-2]), _parse_day(parts[-1])
+                except (IndexError, ValueError):
+                    return self._send(404)
+                items = []
+                day = start
+                while day <= end:
+                    items.extend(make_item(day, i, backend.config.points) for i in range(backend.config.items))
+                    day += datetime.timedelta(days=1)
+                body = json.dumps(items, ensure_ascii=False).encode("utf-8")
+                validators = {"ETag": f'"{zlib.crc32(body):08x}"', "Last-Modified": backend.last_modified}
+                if self._not_modified(validators):
+                    return self._send(304, headers=validators)
+                self._send(200, body, headers=validators)
+
+            def _not_modified(self, validators):
+                if "If-None-Match" in self.headers:
+                    matched = self.headers["If-None-Match"] == validators["ETag"]
+                else:
+                    since = self.headers.get("If-Modified-Since")
+                    matched = since is not None and since == validators["Last-Modified"]
+                if matched:
+                    with backend._lock:
+                        backend.not_modified += 1
+                return matched
+
+            def do_POST(self):
+                self._delay()
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    return self._send(400)
+                item_id = self.path.strip("/").split("/")[0]
+                history = backend.history(item_id)
+                prompt = body.get("prompt") or ""
+
+                if not prompt:
+                    etag = f'"{len(history)}"'
+                    if self._not_modified({"ETag": etag, "Last-Modified": None}):
+                        return self._send(304, headers={"ETag": etag})
+                    since = body.get("since")
+                    if isinstance(since, int) and 0 <= since <= len(history):
+                        return self._json({"since": since, "messages": history[since:]}, {"ETag": etag})
+                    return self._json(history, {"ETag": etag})
+
+                answer = backend.answer(prompt)
+                with backend._lock:
+                    history.append({"role": "user", "content": prompt})
+                    history.append({"role": "assistant", "content": answer})
+                if not body.get("stream"):
+                    return self._json({"response": answer})
+                self._stream(answer)
+
+            def _stream(self, answer):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                step = 6
+                for i in range(0, len(answer), step):
+                    self._chunk(f"data: {json.dumps({'token': answer[i:i + step]}, ensure_ascii=False)}\n\n")
+                    if backend.config.token_delay:
+                        time.sleep(backend.config.token_delay)
+                self._chunk("data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _chunk(self, text):
+                data = text.encode("utf-8")
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+                with backend._lock:
+                    backend.bytes_sent += len(data)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="local stand-in for the farm backend")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--items", type=int, default=10, help="cards per day")
+    parser.add_argument("--points", type=int, default=7, help="points per chart series")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--history", type=int, default=0, help="preloaded messages per item")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between streamed chunks")
+    parser.add_argument("--react", action="store_true", help="answer with agent reasoning before the final answer")
+    args = parser.parse_args()
+
+    backend = MockBackend(
+        MockConfig(args.items, args.points, args.latency, args.history, args.token_delay, react=args.react),
+        host=args.host,
+        port=args.port,
+    )
+    print(f"mock backend on {backend.url}  (LIST_API_URL = \"{backend.url}/list/\")")
+    try:
+        backend._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
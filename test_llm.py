@@ -1,51 +1,62 @@
 import streamlit as st
 import requests
-import json
+import os
 
+from agromind import chat_stream
+from agromind import http_client
 
-def extract_final_answer(response):
-    """
-    从响应中提取Final Answer后的内容
-
-    Args:
-        response (dict): API响应的JSON数据
-
-    Returns:
-        str: Final Answer后的内容
-    """
-    try:
-        content = response['choices'][0]['message']['content']
-        final_answer_marker = "\nFinal Answer: "
-        start_index = content.find(final_answer_marker)
-
-        if start_index != -1:
-            extracted_content = content[start_index + len(final_answer_marker):]
-            return extracted_content.strip()
-        return "未找到Final Answer"
-    except (KeyError, IndexError) as e:
-        return f"提取错误: {str(e)}"
 
-
-def llm_api(prompt):
+def llm_stream(prompt):
     """
-    调用LLM chat API endpoint
+    流式调用LLM chat API, 逐块返回文本
     """
-    url = 'http://39.153.220.86:5000/agent/chat'
+    url = os.environ.get('AGENT_CHAT_URL', 'http://39.153.220.86:5000/agent/chat')
     headers = {
-        'Content-Type': 'application/json'
+        'Content-Type': 'application/json',
+        'Accept': 'text/event-stream, application/json'
     }
     payload = {
-        'prompt': prompt
+        'prompt': prompt,
+        'stream': True
     }
 
-    try:
-        response = requests.post(url, headers=headers, json=payload)
+    with http_client.post(url, endpoint="chat", headers=headers, json=payload, stream=True) as response:
         response.raise_for_status()
-        return response.json()
+        yield from chat_stream.iter_response_text(response)
+
+
+def stream_final_answer(prompt):
+    """
+    边接收边解析: Final Answer出现后立即显示, 之前的推理过程折叠显示
+
+    Returns:
+        str: Final Answer后的内容
+    """
+    reasoning_box = st.expander("思考过程", expanded=False).empty()
+    answer_box = st.empty()
+    answer_box.markdown("<span style='color: #bbbbbb'>*...  思考中  ...*</span>", unsafe_allow_html=True)
+    parser = chat_stream.FinalAnswerParser()
+
+    try:
+        for chunk in llm_stream(prompt):
+            if parser.feed(chunk):
+                answer_box.markdown(parser.answer + "▌")
+            elif not parser.found:
+                reasoning_box.markdown(parser.reasoning)
     except requests.exceptions.RequestException as e:
         st.error(f"请求出错: {e}")
         return None
 
+    if parser.found:
+        answer = parser.close()
+        reasoning_box.markdown(parser.reasoning)
+    else:
+        # 没有Final Answer时, 完整输出保留在思考过程中
+        reasoning_box.markdown(parser.close())
+        answer = "未找到Final Answer"
+    answer_box.markdown(answer)
+    return answer
+
 
 def main():
 
@@ -69,10 +80,8 @@ def main():
 
         # 获取AI响应
         with st.chat_message("assistant"):
-            response = llm_api(user_query)
-            if response:
-                llm_response = extract_final_answer(response)
-                st.markdown(llm_response)
+            llm_response = stream_final_answer(user_query)
+            if llm_response:
                 # 添加助手响应到聊天历史
                 st.session_state.messages.append({"role": "assistant", "content": llm_response})
 